@@ -4,4 +4,15 @@ set -o errexit
 
 pip install -r requirements.txt
 
-python manage.py collectstatic --no-input
\ No newline at end of file
+# incremental - keep staticfiles/ between builds (build cache) and only changed files
+# get copied and recompressed, see portfolio/storage.py
+python manage.py collectstatic --no-input
+
+# compile the markdown articles now so the first visitor doesn't wait for it
+python manage.py compile_articles
+
+# same for the previews of the downloadable documents
+python manage.py build_document_previews
+
+# and the CV, rendered from data.py - skipped when the content hasn't changed
+python manage.py build_cv
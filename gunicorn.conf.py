@@ -0,0 +1,32 @@
+"""
+Gunicorn Config
+Threaded workers - the request path is thread-safe (see portfolio/tests.py ConcurrencyTests),
+so each process serves several requests at once instead of sitting idle on I/O like the
+Resend API, the edge purge or a slow client reading a streamed page.
+A thread costs a few hundred KB, a whole extra worker process costs the full app again
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# module-level state the threads share, and why each is safe - add to this when adding more:
+#   caching.DEPENDENCIES - frozensets replaced under a lock, so readers never see one change
+#   data.py lru_cache indexes - built once from content that never changes in a process
+#   articles._source_hashes/_compiled, documents._source_hashes/_previews - a hash can be
+#     published before its output, so both are looked up on every call, never assumed
+#   singleflight._flights - only touched under its lock
+#   analytics._events - a deque, append/popleft are atomic
+#   services/http.py pools and breakers - each has its own lock
+#   middleware ConcurrencyBudget counters - in_flight and shed only change under the budget's lock
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# load the app once in the master so workers share its memory copy-on-write
+preload_app = True
+
+# keep connections from the proxy open between requests, threads handle them without blocking a worker
+keepalive = 5
+timeout = 30
+graceful_timeout = 20
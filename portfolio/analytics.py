@@ -0,0 +1,139 @@
+"""
+Analytics
+Self-hosted page view and download counts - no third party scripts, no IPs stored.
+Recording an event is a single deque append (atomic in CPython, no lock), and a background
+thread in each worker writes whatever has piled up to an append-only SQLite file in one batch.
+Nothing touches the database on the request path
+"""
+
+from collections import deque
+from contextlib import closing, contextmanager
+from django.conf import settings
+from django.urls import reverse
+from functools import lru_cache
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+from .sitemaps import SITEMAPS
+
+logger = logging.getLogger(__name__)
+
+# the data-download names in the templates and the ones the download views record
+DOWNLOADS = ('cv', 'msc-dissertation', 'bsc-dissertation')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    ts INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    referrer TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE TABLE IF NOT EXISTS daily_counts (
+    day TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (day, kind, name)
+);
+"""
+
+# DB paths this process has already created the schema in
+_ready_paths = set()
+_ready_lock = threading.Lock()
+
+# oldest events fall off the end if the flusher can't keep up, rather than growing forever
+_events = deque(maxlen=settings.ANALYTICS['MAX_BUFFER'])
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def known_pages():
+    """every path a page view can be for - the sitemap plus the CV, which isn't in it"""
+    paths = {reverse('portfolio:cv')}
+    for sitemap_class in SITEMAPS.values():
+        sitemap = sitemap_class()
+        paths.update(sitemap.location(item) for item in sitemap.items())
+    return frozenset(paths)
+
+
+def is_known(kind, name):
+    """false for anything the site itself would never send, so a forged beacon can't fill the store with junk"""
+    if kind == 'pageview':
+        return name in known_pages()
+    return kind == 'download' and name in DOWNLOADS
+
+
+def record(kind, name, referrer=''):
+    """queues one event - cheap enough to call from any view"""
+    if not settings.ANALYTICS['ENABLED']:
+        return
+    _events.append((int(time.time()), kind, name[:200], referrer[:200]))
+
+    # one flusher per process - checked by pid so forked gunicorn workers start their own
+    if _flusher_pid != os.getpid():
+        start_flusher()
+
+
+def start_flusher():
+    global _flusher_pid
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+        thread = threading.Thread(target=flush_forever, name='analytics-flusher', daemon=True)
+        thread.start()
+
+
+def flush_forever():
+    interval = settings.ANALYTICS['FLUSH_INTERVAL']
+    while True:
+        time.sleep(interval)
+        flush()
+
+
+def flush():
+    """writes every buffered event to SQLite in one transaction, returns how many were written"""
+    batch = []
+    while True:
+        try:
+            batch.append(_events.popleft())
+        except IndexError:
+            break
+    if not batch:
+        return 0
+
+    try:
+        with connect() as conn:
+            conn.executemany('INSERT INTO events (ts, kind, name, referrer) VALUES (?, ?, ?, ?)', batch)
+    except sqlite3.Error as e:
+        # counts are nice to have - losing a batch is better than taking a worker down
+        logger.error(f"Dropped {len(batch)} analytics events: {e}")
+        return 0
+    return len(batch)
+
+
+@contextmanager
+def connect():
+    """
+    the analytics store as one transaction - committed if the block finishes, and the connection
+    is closed either way. The schema and WAL (so several workers can append at once) are set up
+    the first time this process opens each path, they're saved in the file after that
+    """
+    path = settings.ANALYTICS['DB_PATH']
+    with closing(sqlite3.connect(path, timeout=5)) as conn:
+        if path not in _ready_paths:
+            with _ready_lock:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.executescript(SCHEMA)
+                _ready_paths.add(path)
+        with conn:
+            yield conn
+
+
+# don't lose the last few seconds of events when a worker shuts down cleanly
+atexit.register(flush)
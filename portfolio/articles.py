@@ -0,0 +1,98 @@
+"""
+Articles
+Compiles the markdown posts in ARTICLES['SOURCE_DIR'] to HTML with highlighted code and a table
+of contents. Output is keyed by a hash of the source and kept in memory and on disk, so each post
+is compiled once per edit - not per request, and not again when a worker restarts
+"""
+
+from django.conf import settings
+from pathlib import Path
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# bump when the extensions or their options change so old compiled output isn't reused
+RENDERER_VERSION = 1
+
+MARKDOWN_EXTENSIONS = ['fenced_code', 'codehilite', 'tables', 'toc']
+MARKDOWN_CONFIG = {
+    'codehilite': {'css_class': 'highlight', 'guess_lang': False},
+    'toc': {'permalink': '#', 'toc_depth': '2-3'},
+}
+
+# source hash -> compiled post
+_compiled = {}
+# (path, mtime, size) -> source hash, so unchanged files aren't re-read on every request
+_source_hashes = {}
+
+
+def source_path(slug):
+    return Path(settings.ARTICLES['SOURCE_DIR']) / f"{slug}.md"
+
+
+def hash_source(source):
+    return hashlib.sha256(f"{RENDERER_VERSION}:{source}".encode('utf-8')).hexdigest()[:16]
+
+
+def compile_article(slug):
+    """{'html', 'toc', 'source_hash'} for a post - raises FileNotFoundError if its markdown is missing"""
+    path = source_path(slug)
+    stat = path.stat()
+    stat_key = (str(path), stat.st_mtime_ns, stat.st_size)
+
+    source = None
+    source_hash = _source_hashes.get(stat_key)
+    if source_hash is None:
+        source = path.read_text(encoding='utf-8')
+        source_hash = _source_hashes[stat_key] = hash_source(source)
+    # checked every time rather than only when the hash is new - another thread can publish the
+    # hash and still be compiling, and it's a KeyError (a 500) for anyone relying on it being there
+    compiled = _compiled.get(source_hash)
+    if compiled is None:
+        compiled = load_compiled(source_hash)
+        if compiled is None:
+            if source is None:
+                source = path.read_text(encoding='utf-8')
+            compiled = store_compiled(source_hash, render_markdown(source))
+        _compiled[source_hash] = compiled
+
+    return compiled
+
+
+def render_markdown(source):
+    # imported here so workers that never serve an article don't pay for markdown and pygments
+    import markdown
+
+    md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS, extension_configs=MARKDOWN_CONFIG)
+    html = md.convert(source)
+    return {'html': html, 'toc': md.toc}
+
+
+def cache_path(source_hash):
+    return Path(settings.ARTICLES['CACHE_DIR']) / f"{source_hash}.json"
+
+
+def load_compiled(source_hash):
+    try:
+        with open(cache_path(source_hash), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def store_compiled(source_hash, compiled):
+    compiled = {**compiled, 'source_hash': source_hash}
+    path = cache_path(source_hash)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename so another worker never reads a half-written file
+        with tempfile.NamedTemporaryFile('w', dir=path.parent, suffix='.tmp', delete=False, encoding='utf-8') as f:
+            json.dump(compiled, f)
+        os.replace(f.name, path)
+    except OSError as e:
+        logger.warning(f"Couldn't cache compiled article {source_hash}: {e}")
+    return compiled
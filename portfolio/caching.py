@@ -0,0 +1,224 @@
+"""
+Caching Helpers
+Every page, fragment and API payload records which data.py sections it's built from.
+That dependency graph drives two things:
+  - Surrogate-Key/Cache-Tag headers so the CDN can purge just the affected pages
+  - server-side cache keys that include the version hash of only those sections,
+    so editing projects leaves the cached about/education pages alone
+Misses go through singleflight.py, so a cold key is rendered once however many requests want it
+"""
+
+from asgiref.sync import sync_to_async
+from functools import wraps
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+import logging
+import threading
+import time
+from . import data, singleflight
+
+logger = logging.getLogger(__name__)
+
+# every page renders personal info and site settings through get_site_context
+SITE_SECTIONS = ('personal_info', 'site_settings')
+
+# name of page/fragment/payload -> content sections it depends on
+# values are frozensets that get replaced rather than changed, so request threads can read
+# them without a lock while another thread is adding to the graph
+DEPENDENCIES = {}
+_dependencies_lock = threading.Lock()
+
+
+# Dependency graph
+
+def register_dependencies(name, sections):
+    """adds sections to what a page or payload is known to depend on"""
+    known = DEPENDENCIES.get(name)
+    if known is None or not known.issuperset(sections):
+        with _dependencies_lock:
+            known = DEPENDENCIES[name] = DEPENDENCIES.get(name, frozenset()) | frozenset(sections)
+    return known
+
+
+def record_reads(name, read):
+    """merges sections actually read at runtime into the graph, warns if the declaration missed any"""
+    missing = read - DEPENDENCIES.get(name, frozenset())
+    if missing:
+        logger.warning(f"{name} reads undeclared content sections: {', '.join(sorted(missing))}")
+        register_dependencies(name, missing)
+
+
+def dependents_of(sections):
+    """every registered page/payload that depends on any of these sections"""
+    sections = set(sections)
+    return sorted(name for name, deps in list(DEPENDENCIES.items()) if deps & sections)
+
+
+def content_cache_key(name, sections):
+    """cache key that only changes when one of these sections changes"""
+    versions = data.current_section_versions()
+    version = data.hash_content([versions.get(s) for s in sorted(sections)])
+    return f"content:{name}:{version}"
+
+
+def validate_sections(sections):
+    unknown = set(sections) - set(data.CONTENT_SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown content sections: {', '.join(sorted(unknown))}")
+
+
+# Cached fragments and payloads
+
+def cached_content(name, sections, compute, timeout=DEFAULT_TIMEOUT, version=None):
+    """
+    Returns compute() from the cache, keyed by the versions of the given sections.
+    Pass version (e.g. a hash of one project) to key on something narrower than a whole section.
+    Anything compute() reads that wasn't declared gets added to the graph for next time
+    """
+    validate_sections(sections)
+    deps = register_dependencies(name, sections)
+    if version is None:
+        key = content_cache_key(name, deps)
+    else:
+        key = f"content:{name}:{version}"
+
+    def compute_and_record():
+        with data.track_sections() as read:
+            value = compute()
+        record_reads(name, read)
+        return value
+
+    return singleflight.get_or_compute(key, compute_and_record, timeout)
+
+
+# Page views
+
+def add_surrogate_keys(request, response, sections):
+    """sets Surrogate-Key (Fastly style) and Cache-Tag (Cloudflare style) headers"""
+    response['Surrogate-Key'] = ' '.join(sections)
+    response['Cache-Tag'] = ','.join(sections)
+
+    # only let the edge hold pages when a TTL is configured and there's nothing per-visitor in it.
+    # the CSRF cookie isn't on the response yet at this point, the middleware adds it afterwards
+    edge_ttl = settings.EDGE_CACHE['TTL']
+    if edge_ttl and is_shareable(request, response):
+        patch_cache_control(response, public=True, s_maxage=edge_ttl)
+    return response
+
+
+def is_shareable(request, response):
+    # a page that used {% csrf_token %} holds a per-visitor token so it can't be shared
+    return not response.cookies and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+
+
+def is_cacheable(request, response):
+    return response.status_code == 200 and is_shareable(request, response)
+
+
+def cache_when_streamed(response, store):
+    """passes a streamed page through untouched and hands the full body to store() once the last chunk is out"""
+    chunks = []
+
+    if response.is_async:
+        async def tee(stream):
+            async for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+            await sync_to_async(store)(b''.join(chunks))
+    else:
+        def tee(stream):
+            for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+            store(b''.join(chunks))
+
+    response.streaming_content = tee(response.streaming_content)
+
+
+def cached_page_response(page):
+    content, content_type = page
+    return HttpResponse(content, content_type=content_type)
+
+
+def render_cached_page(key, request, render, *args, **kwargs):
+    """
+    the page from the cache, otherwise rendered by one request while any others asking for it
+    wait - the same as singleflight.get_or_compute, except it works on responses. A streamed
+    page goes out to the leader as it renders (so the early head flush still works) and lands
+    in the cache once the last chunk has been sent. The others only wait STREAM_WAIT_TIMEOUT
+    for that, then render their own copy rather than ride on one visitor's download speed.
+    Warm hits come out of the cache as one finished body, there's nothing left to flush early
+    """
+    entry = singleflight.get_entry(key)
+    if entry is not None and not singleflight.should_refresh(entry):
+        return cached_page_response(entry.value)
+
+    flight, leading = singleflight.join(key, wait=entry is None)
+    if not leading:
+        cached = entry.value if entry is not None else flight.wait(settings.SINGLE_FLIGHT['STREAM_WAIT_TIMEOUT'])
+        if cached is not None:
+            return cached_page_response(cached)
+        return render(request, *args, **kwargs)
+
+    started = time.monotonic()
+    try:
+        response = render(request, *args, **kwargs)
+    except BaseException:
+        flight.land()
+        raise
+    if not is_cacheable(request, response):
+        flight.land()
+        return response
+
+    content_type = response['Content-Type']
+
+    def store(content):
+        page = (content, content_type)
+        singleflight.set_entry(key, page, time.monotonic() - started)
+        flight.land(page)
+
+    if response.streaming:
+        cache_when_streamed(response, store)
+        # a stream that's abandoned part way never calls store, the waiting requests render their own.
+        # not a weakref finalizer - that can run from GC inside join() while it holds the flights lock.
+        # a response that's never even closed is covered by join() replacing stale flights
+        response._resource_closers.append(flight.land)
+    else:
+        store(response.content)
+    return response
+
+
+def tag_sections(*sections, site_wide=True, cache_page=False):
+    """
+    Decorator for views - declares which data.py sections the page is built from.
+    Personal info and site settings are added automatically unless site_wide=False.
+    With cache_page=True plain GETs are served from the cache until one of those sections changes
+    """
+    validate_sections(sections)
+    all_sections = tuple(dict.fromkeys((SITE_SECTIONS if site_wide else ()) + sections))
+
+    def decorator(view_func):
+        name = view_func.__name__
+        register_dependencies(name, all_sections)
+
+        def render(request, *args, **kwargs):
+            with data.track_sections() as read:
+                response = view_func(request, *args, **kwargs)
+            record_reads(name, read)
+            return response
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if cache_page and request.method in ('GET', 'HEAD') and not request.GET:
+                key = content_cache_key(f"page:{name}", DEPENDENCIES[name])
+                response = render_cached_page(key, request, render, *args, **kwargs)
+            else:
+                response = render(request, *args, **kwargs)
+            return add_surrogate_keys(request, response, all_sections)
+
+        wrapper.content_sections = all_sections
+        return wrapper
+
+    return decorator
@@ -0,0 +1,170 @@
+"""
+CV
+Builds the CV as a standalone HTML page and a PDF straight from data.py, so it can't drift from
+the rest of the site the way a hand-maintained .docx does. Files are named by a hash of the
+content they're built from and only rendered when that hash is new - build.sh makes them once per deploy
+"""
+
+from django.conf import settings
+from django.template.loader import get_template, render_to_string
+from functools import lru_cache
+from pathlib import Path
+import logging
+import os
+import tempfile
+from . import data
+from .pdf import PDFWriter
+
+logger = logging.getLogger(__name__)
+
+# bump when render_pdf() changes, the template is already part of the hash
+RENDERER_VERSION = 1
+
+CV_SECTIONS = ('personal_info', 'experience', 'education', 'skills', 'projects')
+TEMPLATE = 'portfolio/cv.html'
+FORMATS = ('html', 'pdf')
+
+
+@lru_cache(maxsize=1)
+def cv_version():
+    """hash of the sections the CV is built from plus its template - worked out once per process"""
+    versions = data.current_section_versions()
+    return data.hash_content([
+        [versions.get(section) for section in CV_SECTIONS],
+        get_template(TEMPLATE).template.source,
+        RENDERER_VERSION,
+    ])
+
+
+def output_path(version, format):
+    return Path(settings.CV['OUTPUT_DIR']) / f"{version}.{format}"
+
+
+def build_cv():
+    """{'html': path, 'pdf': path} for the current content, rendering them if this version hasn't been built yet"""
+    version = cv_version()
+    paths = {format: output_path(version, format) for format in FORMATS}
+    if not all(path.exists() for path in paths.values()):
+        cv = cv_content()
+        write_atomic(paths['html'], render_html(cv).encode('utf-8'))
+        write_atomic(paths['pdf'], render_pdf(cv))
+        logger.info(f"Built CV {version}")
+    return paths
+
+
+def prune(keep):
+    """deletes CVs built from older content, returns how many files went"""
+    removed = 0
+    for path in Path(settings.CV['OUTPUT_DIR']).glob('*.*'):
+        if path.stem != keep and path.suffix.lstrip('.') in FORMATS:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def write_atomic(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # write then rename so another worker never serves a half-written file
+    with tempfile.NamedTemporaryFile('wb', dir=path.parent, suffix='.tmp', delete=False) as f:
+        f.write(content)
+    os.replace(f.name, path)
+
+
+# Content
+# one structure for both formats - sections of entries with a title, a meta line, text, bullet points and tags
+
+def squash(text):
+    return ' '.join((text or '').split())
+
+
+def date_range(start, end, is_current=False):
+    # no durations, they'd change every day without the content changing
+    finish = 'Present' if is_current or end is None else end.strftime('%b %Y')
+    return f"{start.strftime('%b %Y')} – {finish}"
+
+
+def entry(title, meta='', text='', points=(), tags=''):
+    return {'title': title, 'meta': meta, 'text': squash(text), 'points': [squash(p) for p in points], 'tags': tags}
+
+
+def cv_content():
+    info = data.get_personal_info()
+    experience = [
+        entry(
+            f"{exp.position}, {exp.company}",
+            f"{date_range(exp.start_date, exp.end_date, exp.is_current)} · {exp.location}",
+            exp.description,
+            [*exp.responsibilities, *exp.achievements],
+            exp.skills_gained,
+        )
+        for exp in data.get_all_experience()
+    ]
+    education = [
+        entry(
+            f"{edu.degree_type} {edu.subject}, {edu.institution}",
+            f"{date_range(edu.start_date, edu.end_date, edu.is_current)} · {edu.grade}",
+            edu.description,
+            tags=edu.technologies,
+        )
+        for edu in data.get_all_education()
+    ]
+    projects = [
+        entry(project.title, str(project.created_date.year), project.short_description, tags=project.technologies)
+        for project in data.get_all_projects() if project.featured
+    ]
+    skills = [
+        entry(category, text=', '.join(skill.name for skill in skills))
+        for category, skills in data.get_skills_by_category().items()
+    ]
+
+    return {
+        'name': info.name,
+        'title': info.title,
+        'contacts': [info.email, info.location, strip_scheme(info.github), strip_scheme(info.linkedin)],
+        'bio': squash(info.bio),
+        'sections': [
+            ('Experience', experience),
+            ('Education', education),
+            ('Selected Projects', projects),
+            ('Skills', skills),
+        ],
+    }
+
+
+def strip_scheme(url):
+    return url.split('://', 1)[-1].rstrip('/')
+
+
+# Rendering
+
+def render_html(cv):
+    return render_to_string(TEMPLATE, {'cv': cv})
+
+
+def render_pdf(cv):
+    pdf = PDFWriter(title=f"{cv['name']} - CV", author=cv['name'])
+    pdf.text(cv['name'], size=20, bold=True)
+    pdf.text(cv['title'], size=11, gray=0.35)
+    pdf.text('  |  '.join(cv['contacts']), size=9, gray=0.35)
+    pdf.space(6)
+    pdf.text(cv['bio'], size=9.5)
+
+    for heading, entries in cv['sections']:
+        # keep a heading with at least the start of what's under it
+        pdf.make_room(60)
+        pdf.space(12)
+        pdf.text(heading.upper(), size=10.5, bold=True)
+        pdf.rule()
+        for item in entries:
+            pdf.space(5)
+            pdf.text(item['title'], size=10, bold=True)
+            if item['meta']:
+                pdf.text(item['meta'], size=8.5, gray=0.4)
+            if item['text']:
+                pdf.text(item['text'], size=9.5)
+            for point in item['points']:
+                pdf.text(point, size=9.5, indent=4, bullet=True)
+            if item['tags']:
+                pdf.text(item['tags'], size=8.5, gray=0.4)
+
+    return pdf.render()
@@ -3,7 +3,14 @@ Portfolio Data
 All my content stored here so I can update it without touching the views or templates
 """
 
+from contextlib import contextmanager
 from datetime import date
+from functools import lru_cache, wraps
+import base64
+import bisect
+import binascii
+import contextvars
+import hashlib
 import json
 
 
@@ -132,6 +139,7 @@ EDUCATION = [
 PROJECTS = [
     {
         'title': 'Litigation Intelligence Platform',
+        'slug': 'litigation',
         'short_description': 'AI-powered legal document analysis system processing 18,000+ documents in 48 hours.',
         'detailed_description': """Production-grade legal AI system that analyses large-scale commercial litigation 
                                 using a 4-pass iterative architecture with Claude models. Intelligently triages 
@@ -150,10 +158,32 @@ PROJECTS = [
             'Autonomous recursive investigation engine',
             'Multi-tier memory system with vector database',
             'Cost optimised at £0.014-0.021 per document'
+        ],
+        # Card content for the projects page
+        'summary': 'Developed two AI systems for civil litigation: document matching pipeline and conversational RAG chatbot with cumulative knowledge graphs.',
+        'tech_pills': ['Python', 'Claude API', 'ChromaDB', 'Legal-BERT', 'BM25', 'RAG', 'Excel'],
+        'feature_sections': [
+            {
+                'heading': 'Document Matching Pipeline',
+                'items': [
+                    'Document pipeline processing 8,000+ PDFs via PyPDF2, Tesseract OCR, Claude Vision API 3-stage verification: metadata extraction → fuzzy matching → visual verification.',
+                    'Found 20 duplicates (85-100% confidence) across variable formats using exact date matching, 50-85% fuzzy similarity, and custom abbreviation normalisation.'
+                ]
+            },
+            {
+                'heading': 'Conversational RAG Chatbot',
+                'items': [
+                    'Hybrid RAG system combining Legal-BERT embeddings (local), and BM25 keyword matching across 20,000+ documents with query routing to specialised analysis templates.',
+                    'Implemented cumulative knowledge graph storing findings across sessions (smoking guns, evidence chains, contradictions, legal arguments); system learned from each query, building progressively deeper case understanding.',
+                    'Enabled queries like "find smoking guns" or "build timeline of concealment"; the system first established foundational case knowledge from pleadings, then answered increasingly sophisticated questions by building upon prior discoveries.',
+                    'Produced tribunal-ready documentation (memoranda, skeleton arguments, cross-examination scripts) by synthesising cumulative knowledge; generated novel arguments, discovered new document connections, reduced brief preparation time by 70%.'
+                ]
+            }
         ]
     },
     {
         'title': 'Cryptocurrency Exchange Platform',
+        'slug': 'crypto',
         'short_description': 'Custom order matching engine with price-time priority algorithm.',
         'detailed_description': """Built a cryptocurrency exchange from scratch focused on stablecoin trading. 
                                   Custom order matching engine with price-time priority, RESTful API for account 
@@ -170,10 +200,25 @@ PROJECTS = [
             'Custom order matching engine',
             'Real-time WebSocket updates',
             'Secure authentication'
+        ],
+        # Card content for the projects page
+        'summary': 'Building a cryptocurrency exchange from scratch with custom order matching engine and real-time WebSocket price feeds.',
+        'tech_pills': ['Django', 'PostgreSQL', 'WebSockets', 'REST API'],
+        'feature_sections': [
+            {
+                'heading': 'Core Features',
+                'items': [
+                    'Built real-time matching engine processing orders with price-time priority and O(log n) insertion complexity',
+                    'Implemented deterministic wallet derivation enabling non-custodial architecture with mathematical key generation',
+                    'Optimised database queries using ORM prefetching and indexing',
+                    'Integrated Web3.js blockchain connectors for automated Ethereum transaction monitoring and deposit detection'
+                ]
+            }
         ]
     },
     {
         'title': 'Holiday Cluedo PWA',
+        'slug': 'cluedo',
         'short_description': 'Progressive Web App version of Cluedo for offline holiday entertainment.',
         'detailed_description': """Built a PWA version of Cluedo optimised for holiday entertainment. Written in 
                                   vanilla JavaScript for maximum performance, supports 20+ concurrent users. 
@@ -183,17 +228,31 @@ PROJECTS = [
         'category': 'personal',
         'status': 'completed',
         'featured': True,
-        'github_url': 'https://github.com/JemAndrew/holiday-cluedo',
+        'github_url': 'https://github.com/JemAndrew/holiday_cluedo',
         'live_demo_url': None,
         'created_date': date(2023, 12, 1),
         'key_features': [
             '20+ concurrent user support',
             'Offline gameplay capability',
             'Fisher-Yates shuffle algorithm'
+        ],
+        # Card content for the projects page
+        'summary': 'Engineered a multiplayer elimination game using vanilla JavaScript with advanced features including finite state machine architecture, random assignment algorithms, and Progressive Web App functionality.',
+        'tech_pills': ['JavaScript', 'PWA', 'Service Workers', 'WebSockets', 'LocalStorage API'],
+        'feature_sections': [
+            {
+                'heading': 'Game Features',
+                'items': [
+                    'Implemented complex game logic algorithms including Fisher-Yates shuffle for random assignment and collision detection to ensure balanced gameplay across 3+ concurrent players',
+                    'Engineered finite state machine architecture managing multi-phase user flows (setup → briefing → elimination → victory) with persistent state management via localStorage API',
+                    'Created accessible keyboard navigation with Enter key support across all input fields'
+                ]
+            }
         ]
     },
     {
         'title': 'Medical AI Diagnostic System',
+        'slug': 'medical',
         'short_description': 'MSc dissertation comparing CNN architectures for skin cancer detection.',
         'detailed_description': """Research project comparing novel and standard CNN architectures for automated 
                                   skin cancer detection. Built an FDA-compliant evaluation framework with transfer 
@@ -210,10 +269,24 @@ PROJECTS = [
             'FDA-compliant evaluation framework',
             'Transfer learning with EfficientNet and ResNet',
             'Ensemble methods for improved accuracy'
+        ],
+        # Card content for the projects page
+        'summary': 'Developed a comprehensive medical AI evaluation framework comparing my own novel architecture and four state-of-the-art CNN architectures (ResNet50, InceptionV3, DenseNet121, EfficientNetB0) for 7-class skin cancer classification using clinical-grade diagnostic metrics on HAM10000 and ISIC2019 dermoscopy datasets.',
+        'tech_pills': ['PyTorch', 'Python', 'CNN', 'Medical AI'],
+        'feature_sections': [
+            {
+                'heading': 'Research Contributions',
+                'items': [
+                    'Architected modular evaluation framework with custom PyTorch dataset classes, metrics engines, and reproducible research infrastructure',
+                    'Engineered production-ready data pipelines with medical metadata integration, stratified sampling, and computed class weights',
+                    'Implemented comprehensive logging, checkpointing, and visualisation systems for multi-architecture comparative analysis'
+                ]
+            }
         ]
     },
     {
         'title': 'Bike Route Planning Application',
+        'slug': 'bike',
         'short_description': 'Full-stack cycling route app built with Flask, React and MongoDB.',
         'detailed_description': """Team project building a cycling route application (scored 85%). Built REST API 
                                   endpoints for user authentication and route management. Followed agile methodology 
@@ -229,10 +302,24 @@ PROJECTS = [
             'REST API for authentication',
             'HERE Maps integration',
             'Agile team collaboration'
+        ],
+        # Card content for the projects page
+        'summary': 'Full-stack cycling route application built in a team of 5, integrating HERE Maps API for route planning.',
+        'tech_pills': ['Flask', 'React', 'MongoDB', 'HERE Maps'],
+        'feature_sections': [
+            {
+                'heading': 'Development Highlights',
+                'items': [
+                    'REST API for authentication and routes',
+                    'HERE Maps API integration',
+                    'Agile team collaboration'
+                ]
+            }
         ]
     },
     {
         'title': 'Portfolio Website',
+        'slug': 'portfolio-project',
         'short_description': 'Professional Django portfolio with responsive design and modern UI.',
         'detailed_description': """This portfolio website showcasing my work through clean design and efficient code. 
                                   Built with Django and modern web technologies, focused on performance with minimal 
@@ -241,18 +328,52 @@ PROJECTS = [
         'category': 'personal',
         'status': 'completed',
         'featured': False,
-        'github_url': 'https://github.com/JemAndrew/portfolio',
+        'github_url': 'https://github.com/JemAndrew/cv-website',
         'live_demo_url': None,
         'created_date': date(2024, 11, 1),
         'key_features': [
             'Responsive modern design',
             'Optimised performance',
             'Clean code architecture'
+        ],
+        # Card content for the projects page
+        'summary': 'A production-ready Django portfolio website built with clean architecture and modern web practices. The site demonstrates full-stack capabilities from Django backend design to vanilla JavaScript frontend, deployed on Railway with proper security hardening.',
+        'tech_pills': ['Django', 'CSS3', 'JavaScript', 'WhiteNoise'],
+        'feature_sections': [
+            {
+                'heading': 'Design Features',
+                'items': [
+                    'Responsive modern design with a Data-driven Django architecture',
+                    'Deployed on Railway with Gunicorn, automated security hardening, and environment-based configuration, HTTPS redirects, HSTS headers, and WhiteNoise for efficient static file serving without external storage',
+                    'Custom eye-tracking feature on the Notion avatars eyes that follow your cursor using real-time coordinate calculations and smooth CSS transforms.',
+                    'Production grade AJAX contact form server side validation with field level errors, honeypot spam protection, asynchronous email sending, and smooth UX with loading states and real time feedback.'
+                ]
+            }
         ]
     }
 ]
 
 
+# Writing - the posts are markdown files in content/articles/<slug>.md, this is just the index
+# so listing them never touches the files (articles.py compiles the bodies)
+ARTICLES = [
+    {
+        'slug': 'streaming-django-templates',
+        'title': 'Streaming Django Templates',
+        'published': date(2026, 9, 21),
+        'summary': 'Getting the <head> of a page to the browser before the rest of it has rendered, without giving up template inheritance.',
+        'tags': ['Django', 'Performance'],
+    },
+    {
+        'slug': 'caching-by-content-hash',
+        'title': 'Caching by Content Hash',
+        'published': date(2026, 8, 30),
+        'summary': 'Cache keys that change when the content does, so nothing on this site ever needs clearing by hand.',
+        'tags': ['Django', 'Caching'],
+    },
+]
+
+
 # Technical skills organised by category
 SKILLS = {
     'Programming Languages': [
@@ -315,8 +436,80 @@ SITE_SETTINGS = {
 }
 
 
+# Content sections - the names used in cache tags, mapped to the data above
+# Add new top-level content here too so edits to it get purged from the edge cache
+CONTENT_SECTIONS = {
+    'personal_info': 'PERSONAL_INFO',
+    'experience': 'EXPERIENCE',
+    'education': 'EDUCATION',
+    'projects': 'PROJECTS',
+    'articles': 'ARTICLES',
+    'skills': 'SKILLS',
+    'site_settings': 'SITE_SETTINGS',
+}
+
+
+def hash_content(value):
+    """Short stable hash of a chunk of content - dates get turned into strings"""
+    encoded = json.dumps(value, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:12]
+
+
+def get_section_versions(namespace=None):
+    """Returns a hash per content section, pass an older data.py's globals to compare versions"""
+    namespace = globals() if namespace is None else namespace
+    return {
+        section: hash_content(namespace[variable])
+        for section, variable in CONTENT_SECTIONS.items()
+        if variable in namespace
+    }
+
+
+@lru_cache(maxsize=1)
+def current_section_versions():
+    """Section hashes for the content loaded in this process - only worked out once"""
+    return get_section_versions()
+
+
+# Tracking which sections get read, so pages and cached payloads can record what they depend on
+
+_sections_read = contextvars.ContextVar('sections_read', default=None)
+
+
+@contextmanager
+def track_sections():
+    """Collects the names of every section the helpers below read inside the block"""
+    outer = _sections_read.get()
+    read = set()
+    token = _sections_read.set(read)
+    try:
+        yield read
+    finally:
+        _sections_read.reset(token)
+        # nested tracking still counts towards the outer block
+        if outer is not None:
+            outer.update(read)
+
+
+def reads(*sections):
+    """Decorator for helpers - marks which content sections they're built from"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            read = _sections_read.get()
+            if read is not None:
+                read.update(sections)
+            return func(*args, **kwargs)
+
+        wrapper.sections = sections
+        return wrapper
+
+    return decorator
+
+
 # Helper functions to fetch and format data for views
 
+@reads('personal_info')
 def get_personal_info():
     """Converts personal info dict into an object with dot notation"""
     info = SimpleObject(PERSONAL_INFO)
@@ -325,6 +518,7 @@ def get_personal_info():
     return info
 
 
+@reads('projects')
 def get_all_projects():
     """Returns all projects sorted by date, newest first"""
     projects = []
@@ -336,10 +530,61 @@ def get_all_projects():
         proj.technology_list = project_data['technologies'].split(', ')
         projects.append(proj)
     
-    projects.sort(key=lambda x: x.created_date, reverse=True)
+    projects.sort(key=project_sort_key)
     return projects
 
 
+def project_sort_key(project):
+    """Newest first, slug breaks ties so the order (and paging cursors) stay stable"""
+    return (-project.created_date.toordinal(), project.slug)
+
+
+def encode_project_cursor(project):
+    """Opaque 'load more' cursor pointing just after this project in the sorted list"""
+    raw = f"{project.created_date.isoformat()}|{project.slug}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_project_cursor(cursor):
+    """Turns a cursor back into a sort key, raises ValueError if it's been tampered with"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        created, slug = raw.split('|', 1)
+        return (-date.fromisoformat(created).toordinal(), slug)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid project cursor: {cursor!r}")
+
+
+@reads('projects')
+def get_projects_page(after=None, limit=4):
+    """
+    Returns (projects, next_cursor) for one page of get_all_projects().
+    Cursor is a position not an index, so a project being added or removed doesn't skip or repeat cards
+    """
+    projects = get_all_projects()
+    start = 0
+    if after:
+        keys = [project_sort_key(p) for p in projects]
+        start = bisect.bisect_right(keys, decode_project_cursor(after))
+
+    page = projects[start:start + limit]
+    has_more = start + limit < len(projects)
+    return page, (encode_project_cursor(page[-1]) if has_more else None)
+
+
+@reads('projects')
+def get_project(slug):
+    """Looks up one project by slug, None if there isn't one"""
+    return projects_by_slug().get(slug)
+
+
+@lru_cache(maxsize=1)
+def projects_by_slug():
+    """Slug index over the loaded content - built once per process, same as the section versions"""
+    return {project.slug: project for project in get_all_projects()}
+
+
+@reads('projects')
 def get_featured_projects(limit=3):
     """Returns only featured projects for home page"""
     all_projects = get_all_projects()
@@ -347,6 +592,26 @@ def get_featured_projects(limit=3):
     return featured[:limit]
 
 
+@reads('articles')
+def get_all_articles():
+    """Returns the article index newest first - only metadata, the markdown isn't read here"""
+    articles = [SimpleObject(article) for article in ARTICLES]
+    articles.sort(key=lambda article: (-article.published.toordinal(), article.slug))
+    return articles
+
+
+@reads('articles')
+def get_article(slug):
+    """Looks up one article by slug, None if there isn't one"""
+    return articles_by_slug().get(slug)
+
+
+@lru_cache(maxsize=1)
+def articles_by_slug():
+    return {article.slug: article for article in get_all_articles()}
+
+
+@reads('experience')
 def get_current_experience():
     """Returns the primary current position for hero section"""
     for exp in EXPERIENCE:
@@ -355,12 +620,14 @@ def get_current_experience():
     return None
 
 
+@reads('experience')
 def get_all_current_experience():
     """Returns all current positions for about page"""
     current = [exp for exp in EXPERIENCE if exp.get('is_current')]
     return [create_experience_object(exp) for exp in current]
 
 
+@reads('experience')
 def get_all_experience():
     """Returns complete work history"""
     return [create_experience_object(exp) for exp in EXPERIENCE]
@@ -391,6 +658,7 @@ def create_experience_object(exp_data):
     return exp
 
 
+@reads('education')
 def get_all_education():
     """Returns all education with calculated fields"""
     educations = []
@@ -413,6 +681,7 @@ def get_all_education():
     return educations
 
 
+@reads('skills')
 def get_skills_by_category():
     """Returns skills organised by category with extra calculated fields"""
     skills_dict = {}
@@ -438,6 +707,7 @@ def get_skills_by_category():
     return skills_dict
 
 
+@reads('site_settings')
 def get_site_settings():
     """Returns site settings as object"""
     return SimpleObject(SITE_SETTINGS)
\ No newline at end of file
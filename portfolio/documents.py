@@ -0,0 +1,305 @@
+"""
+Document Previews
+Pulls a lightweight preview (title, abstract, headings, the first page or so of text and an SVG
+thumbnail) out of the downloadable .docx files, so visitors can see what's in them without
+downloading megabytes. Previews are keyed by a hash of the file and kept in memory and on disk,
+build.sh makes them once per deploy
+"""
+
+from django.conf import settings
+from pathlib import Path
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import textwrap
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+# bump when the extraction or thumbnail changes so old previews aren't reused
+PREVIEW_VERSION = 1
+
+# the files the download views serve, key -> file in DOCUMENT_PREVIEWS['SOURCE_DIR']
+# (the CV isn't one of them any more, it's generated from data.py - see cv.py)
+DISSERTATION_FILES = {
+    'msc': 'download_msc.docx',
+    'bsc': 'download_bsc.docx',
+}
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+DC_TITLE = '{http://purl.org/dc/elements/1.1/}title'
+
+HEADING_STYLE_RE = re.compile(r'heading|title', re.IGNORECASE)
+MAX_HEADING_LENGTH = 60
+MAX_HEADINGS = 20
+ABSTRACT_WORDS = 150
+
+# source hash -> preview
+_previews = {}
+# (path, mtime, size) -> source hash, so unchanged files aren't re-hashed on every request
+_source_hashes = {}
+
+
+def source_path(key):
+    return Path(settings.DOCUMENT_PREVIEWS['SOURCE_DIR']) / DISSERTATION_FILES[key]
+
+
+def hash_file(path):
+    digest = hashlib.sha256(f"{PREVIEW_VERSION}:".encode('utf-8'))
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def get_preview(key):
+    """preview dict for one of DISSERTATION_FILES, None if the file is missing or can't be read"""
+    path = source_path(key)
+    try:
+        stat = path.stat()
+    except OSError:
+        logger.warning(f"Document not found for preview: {path}")
+        return None
+    stat_key = (str(path), stat.st_mtime_ns, stat.st_size)
+
+    source_hash = _source_hashes.get(stat_key)
+    if source_hash is None:
+        source_hash = _source_hashes[stat_key] = hash_file(path)
+    if source_hash not in _previews:
+        preview = load_preview(source_hash)
+        if preview is None:
+            try:
+                preview = store_preview(source_hash, extract_preview(path))
+            except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+                logger.error(f"Couldn't build a preview of {path}: {e}")
+                return None
+        _previews[source_hash] = preview
+
+    return _previews[source_hash]
+
+
+def get_previews(keys):
+    """{key: preview} for the documents that have one"""
+    previews = {key: get_preview(key) for key in keys}
+    return {key: preview for key, preview in previews.items() if preview is not None}
+
+
+# Extracting
+
+def extract_preview(path):
+    with zipfile.ZipFile(path) as docx:
+        body = ElementTree.fromstring(docx.read('word/document.xml'))
+        style_names = read_style_names(docx)
+        title = read_core_title(docx)
+
+    paragraphs = [
+        paragraph for paragraph in (read_paragraph(p, style_names, in_table) for p, in_table in iter_paragraphs(body))
+        if paragraph['text']
+    ]
+    if not title and paragraphs:
+        title = paragraphs[0]['text']
+    # the title is usually repeated as the first line, no point showing it twice
+    if paragraphs and paragraphs[0]['text'].casefold() == title.casefold():
+        paragraphs = paragraphs[1:]
+
+    abstract = find_abstract(paragraphs)
+    headings = []
+    for paragraph in paragraphs:
+        if paragraph['heading'] and paragraph['text'] not in headings:
+            headings.append(paragraph['text'])
+
+    return {
+        'title': title,
+        'abstract': abstract,
+        'headings': headings[:MAX_HEADINGS],
+        'excerpt': first_page(paragraphs, abstract),
+        'word_count': sum(len(p['text'].split()) for p in paragraphs),
+        'size': path.stat().st_size,
+        'filename': path.name,
+        'thumbnail': render_thumbnail(title, paragraphs),
+    }
+
+
+def read_style_names(docx):
+    try:
+        styles = ElementTree.fromstring(docx.read('word/styles.xml'))
+    except KeyError:
+        return {}
+    names = {}
+    for style in styles.iter(f'{W}style'):
+        name = style.find(f'{W}name')
+        names[style.get(f'{W}styleId')] = name.get(f'{W}val') if name is not None else ''
+    return names
+
+
+def read_core_title(docx):
+    try:
+        core = ElementTree.fromstring(docx.read('docProps/core.xml'))
+    except KeyError:
+        return ''
+    title = core.find(DC_TITLE)
+    return ' '.join((title.text or '').split()) if title is not None else ''
+
+
+def walk(element):
+    """descendants in document order, leaving out text boxes - figure labels and the like"""
+    for child in element:
+        if child.tag != f'{W}txbxContent':
+            yield child
+            yield from walk(child)
+
+
+def iter_paragraphs(element, in_table=False):
+    """(paragraph, in a table?) in document order"""
+    # a paragraph never holds another one outside a text box, so there's no need to look inside them
+    for child in element:
+        if child.tag == f'{W}p':
+            yield child, in_table
+        elif child.tag != f'{W}txbxContent':
+            yield from iter_paragraphs(child, in_table or child.tag == f'{W}tbl')
+
+
+def read_paragraph(paragraph, style_names, in_table=False):
+    parts = []
+    for element in walk(paragraph):
+        if element.tag == f'{W}t':
+            parts.append(element.text or '')
+        elif element.tag in (f'{W}tab', f'{W}br'):
+            parts.append(' ')
+    text = ' '.join(''.join(parts).split())
+
+    style = paragraph.find(f'{W}pPr/{W}pStyle')
+    style_name = style_names.get(style.get(f'{W}val'), '') if style is not None else ''
+    # bold column headers in tables aren't section headings
+    heading = bool(text) and not in_table and is_heading(paragraph, style_name, text)
+    return {'text': text, 'heading': heading}
+
+
+def is_heading(paragraph, style_name, text):
+    # long lines and "Label: value" lines are body text whatever style they've been given
+    if len(text) > MAX_HEADING_LENGTH or ':' in text or text.endswith(('.', ',', ';')):
+        return False
+    if HEADING_STYLE_RE.search(style_name) or paragraph.find(f'{W}pPr/{W}outlineLvl') is not None:
+        return True
+    # plenty of documents just make a short line bold instead of using a heading style
+    runs = [
+        run for run in walk(paragraph)
+        if run.tag == f'{W}r' and ''.join(t.text or '' for t in run.iter(f'{W}t')).strip()
+    ]
+    return bool(runs) and all(is_bold(run) for run in runs)
+
+
+def is_bold(run):
+    bold = run.find(f'{W}rPr/{W}b')
+    return bold is not None and bold.get(f'{W}val', 'true') not in ('0', 'false')
+
+
+def find_abstract(paragraphs):
+    """the paragraph under an "Abstract" or "Summary" heading, otherwise the first proper paragraph"""
+    candidates = []
+    for index, paragraph in enumerate(paragraphs):
+        if paragraph['heading'] and re.search(r'abstract|summary', paragraph['text'], re.IGNORECASE):
+            candidates = paragraphs[index + 1:]
+            break
+    for paragraph in candidates or paragraphs:
+        if not paragraph['heading'] and len(paragraph['text'].split()) >= 25:
+            return truncate_words(paragraph['text'], ABSTRACT_WORDS)
+    return ''
+
+
+def first_page(paragraphs, abstract):
+    """roughly the first page of text, headings included, as [{'text', 'heading'}]"""
+    excerpt = []
+    words = 0
+    for paragraph in paragraphs:
+        if words >= settings.DOCUMENT_PREVIEWS['EXCERPT_WORDS']:
+            break
+        if abstract and paragraph['text'].startswith(abstract.rstrip('…')):
+            # it's shown on its own, and so is the heading above it
+            if excerpt and excerpt[-1]['heading']:
+                excerpt.pop()
+            continue
+        excerpt.append(paragraph)
+        words += len(paragraph['text'].split())
+    # don't finish on a heading with nothing under it
+    while excerpt and excerpt[-1]['heading']:
+        excerpt.pop()
+    return excerpt
+
+
+def truncate_words(text, limit):
+    words = text.split()
+    return text if len(words) <= limit else ' '.join(words[:limit]) + '…'
+
+
+# Thumbnail
+# a miniature page - the title as real text, then a bar for each line of the opening paragraphs
+
+THUMBNAIL_WIDTH = 120
+THUMBNAIL_HEIGHT = 160
+THUMBNAIL_MARGIN = 10
+THUMBNAIL_LINE_CHARS = 48
+
+
+def render_thumbnail(title, paragraphs):
+    text_width = THUMBNAIL_WIDTH - 2 * THUMBNAIL_MARGIN
+    titles = []
+    y = THUMBNAIL_MARGIN + 8
+    for line in textwrap.wrap(title, 22)[:2]:
+        titles.append(f'<text x="{THUMBNAIL_MARGIN}" y="{y}" class="title">{escape(line)}</text>')
+        y += 10
+
+    # every bar goes into one of two paths, a <rect> each would be several times the size
+    bars = {'heading': [], 'line': []}
+    y += 4
+    for paragraph in paragraphs:
+        kind = 'heading' if paragraph['heading'] else 'line'
+        for line in textwrap.wrap(paragraph['text'], THUMBNAIL_LINE_CHARS):
+            if y > THUMBNAIL_HEIGHT - THUMBNAIL_MARGIN:
+                break
+            width = round(text_width * len(line) / THUMBNAIL_LINE_CHARS)
+            bars[kind].append(f'M{THUMBNAIL_MARGIN} {y}h{width}v2h-{width}z')
+            y += 4
+        y += 3 if paragraph['heading'] else 2
+
+    paths = ''.join(f'<path d="{"".join(d)}" class="{kind}"/>' for kind, d in bars.items() if d)
+    label = escape(f"First page of {title}", {'"': '&quot;'})
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {THUMBNAIL_WIDTH} {THUMBNAIL_HEIGHT}" '
+        f'class="document-thumbnail" role="img" aria-label="{label}">'
+        f'<rect width="{THUMBNAIL_WIDTH}" height="{THUMBNAIL_HEIGHT}" rx="3" class="page"/>'
+        f'{"".join(titles)}{paths}</svg>'
+    )
+
+
+# Disk cache
+
+def cache_path(source_hash):
+    return Path(settings.DOCUMENT_PREVIEWS['CACHE_DIR']) / f"{source_hash}.json"
+
+
+def load_preview(source_hash):
+    try:
+        with open(cache_path(source_hash), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def store_preview(source_hash, preview):
+    preview = {**preview, 'source_hash': source_hash}
+    path = cache_path(source_hash)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename so another worker never reads a half-written file
+        with tempfile.NamedTemporaryFile('w', dir=path.parent, suffix='.tmp', delete=False, encoding='utf-8') as f:
+            json.dump(preview, f)
+        os.replace(f.name, path)
+    except OSError as e:
+        logger.warning(f"Couldn't cache document preview {source_hash}: {e}")
+    return preview
@@ -0,0 +1,107 @@
+"""
+Downloads
+File responses for the downloadable documents that answer Range requests, so an interrupted
+download picks up where it stopped and PDF viewers can fetch just the part they're showing
+instead of the whole file again - FileResponse on its own always sends everything
+"""
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+import os
+import re
+
+# one range only - a multi-range request gets the whole file, which the spec allows
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def file_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    (first, last) byte of a Range header, inclusive - None means send the whole file.
+    Raises ValueError when the range starts past the end and a 416 is the right answer
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if match is None or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-500 is the last 500 bytes
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError(f"Unsatisfiable range: {header}")
+        return max(size - suffix, 0), size - 1
+    first = int(first)
+    if first >= size:
+        raise ValueError(f"Unsatisfiable range: {header}")
+    last = min(int(last), size - 1) if last else size - 1
+    # backwards ranges are malformed rather than unsatisfiable, so the header is ignored
+    return (first, last) if last >= first else None
+
+
+def if_range_matches(request, etag, stat):
+    """false when If-Range names an older copy of the file - resuming would splice two versions together"""
+    value = request.headers.get('If-Range')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        # weak validators never match here, byte ranges need an exact copy
+        return value == etag
+    return parse_http_date_safe(value) == int(stat.st_mtime)
+
+
+def read_range(f, first, length):
+    try:
+        f.seek(first)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def ranged_file_response(request, path, filename, content_type, as_attachment=True):
+    """
+    FileResponse for path, or a 206 with only the bytes asked for when there's a Range header.
+    Raises OSError if the file can't be opened, same as open()
+    """
+    f = open(path, 'rb')
+    stat = os.fstat(f.fileno())
+    etag = file_etag(stat)
+
+    byte_range = None
+    header = request.headers.get('Range')
+    if header and request.method in ('GET', 'HEAD') and if_range_matches(request, etag, stat):
+        try:
+            byte_range = parse_range(header, stat.st_size)
+        except ValueError:
+            f.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{stat.st_size}"
+            response['Accept-Ranges'] = 'bytes'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(f, as_attachment=as_attachment, filename=filename, content_type=content_type)
+    else:
+        first, last = byte_range
+        response = StreamingHttpResponse(read_range(f, first, last - first + 1), status=206, content_type=content_type)
+        response['Content-Length'] = last - first + 1
+        response['Content-Range'] = f"bytes {first}-{last}/{stat.st_size}"
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
+
+
+def is_full_download(response):
+    """true for a response that starts the file from the top, so a resumed download isn't counted twice"""
+    return response.status_code == 200 or response.get('Content-Range', '').startswith('bytes 0-')
@@ -0,0 +1,35 @@
+"""
+Feeds
+RSS for the writing section
+"""
+
+from datetime import datetime, time, timezone
+from django.contrib.syndication.views import Feed
+from django.urls import reverse
+from . import data
+
+
+class LatestArticlesFeed(Feed):
+    title = 'Jem Andrew - Writing'
+    description = 'Notes and articles on Django, performance and machine learning.'
+
+    def link(self):
+        return reverse('portfolio:articles')
+
+    def items(self):
+        return data.get_all_articles()[:20]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.summary
+
+    def item_link(self, item):
+        return reverse('portfolio:article_detail', args=[item.slug])
+
+    def item_pubdate(self, item):
+        return datetime.combine(item.published, time.min, tzinfo=timezone.utc)
+
+    def item_categories(self, item):
+        return item.tags
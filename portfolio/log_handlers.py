@@ -0,0 +1,18 @@
+"""
+Log Handlers
+"""
+
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+
+class LazyRotatingFileHandler(RotatingFileHandler):
+    """Rotating file log that only creates its folder and file when something is first logged"""
+
+    def __init__(self, filename, *args, **kwargs):
+        kwargs['delay'] = True
+        super().__init__(filename, *args, **kwargs)
+
+    def _open(self):
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return super()._open()
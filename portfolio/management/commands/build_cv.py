@@ -0,0 +1,23 @@
+"""
+Build CV
+Renders the HTML and PDF CV from data.py into CV['OUTPUT_DIR'], so the first download after a
+deploy doesn't wait for it - nothing is rendered if the content hasn't changed, and CVs built
+from older content are cleared out
+"""
+
+from django.core.management.base import BaseCommand
+from portfolio import cv
+
+
+class Command(BaseCommand):
+    help = 'Builds the HTML and PDF CV from the portfolio content'
+
+    def handle(self, *args, **options):
+        paths = cv.build_cv()
+        for path in paths.values():
+            self.stdout.write(f"{path.name}  {path.stat().st_size / 1024:.1f} KB")
+
+        removed = cv.prune(keep=cv.cv_version())
+        if removed:
+            self.stdout.write(f"Removed {removed} outdated file{'s' if removed != 1 else ''}")
+        self.stdout.write(self.style.SUCCESS('CV built'))
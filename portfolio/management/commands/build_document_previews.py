@@ -0,0 +1,27 @@
+"""
+Build Document Previews
+Extracts the previews of the downloadable documents into the on-disk cache, so a
+fresh deploy doesn't unzip megabytes of .docx on the first request - unchanged
+files are skipped
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from portfolio import documents
+
+
+class Command(BaseCommand):
+    help = 'Builds the previews of the downloadable .docx documents'
+
+    def handle(self, *args, **options):
+        failed = []
+        for key, filename in documents.DISSERTATION_FILES.items():
+            preview = documents.get_preview(key)
+            if preview is None:
+                failed.append(filename)
+                continue
+            self.stdout.write(f"{preview['source_hash']}  {filename}")
+
+        if failed:
+            raise CommandError(f"No preview for: {', '.join(failed)} (looked in {settings.DOCUMENT_PREVIEWS['SOURCE_DIR']})")
+        self.stdout.write(self.style.SUCCESS('Document previews built'))
@@ -0,0 +1,47 @@
+"""
+Collect Static
+Django's collectstatic, but a file already in STATIC_ROOT is only replaced when its content
+changed - a fresh checkout gives every source file a new mtime, which would otherwise copy
+everything again. Compression reuse is handled by portfolio.storage
+"""
+
+from django.contrib.staticfiles.management.commands import collectstatic
+
+
+def same_content(storage_a, path_a, storage_b, path_b):
+    if storage_a.size(path_a) != storage_b.size(path_b):
+        return False
+    with storage_a.open(path_a) as a, storage_b.open(path_b) as b:
+        while True:
+            chunk = a.read(1024 * 1024)
+            if chunk != b.read(1024 * 1024):
+                return False
+            if not chunk:
+                return True
+
+
+class Command(collectstatic.Command):
+    help = collectstatic.Command.help + ' Unchanged files are detected by content and skipped.'
+
+    def delete_file(self, path, prefixed_path, source_storage):
+        if self.symlink or not self.storage.exists(prefixed_path):
+            return super().delete_file(path, prefixed_path, source_storage)
+
+        if same_content(self.storage, prefixed_path, source_storage, path):
+            self.log(f"Skipping '{path}' (content unchanged)")
+            return False
+
+        # changed content always gets copied, even when the timestamps say otherwise
+        if self.dry_run:
+            self.log(f"Pretending to delete '{path}'")
+        else:
+            self.log(f"Deleting '{path}'")
+            self.storage.delete(prefixed_path)
+        return True
+
+    def collect(self):
+        collected = super().collect()
+        compressed = getattr(self.storage, 'compressed_count', None)
+        if compressed is not None and self.post_process:
+            self.log(f"Compressed {compressed} new files, reused {self.storage.reused_count} compressed files", level=1)
+        return collected
@@ -0,0 +1,27 @@
+"""
+Compile Articles
+Compiles every article's markdown into the on-disk cache, so a fresh deploy
+doesn't compile them on the first request - unchanged posts are skipped
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from portfolio import articles, data
+
+
+class Command(BaseCommand):
+    help = 'Compiles the markdown articles into the compiled article cache'
+
+    def handle(self, *args, **options):
+        missing = []
+        for article in data.get_all_articles():
+            try:
+                compiled = articles.compile_article(article.slug)
+            except FileNotFoundError:
+                missing.append(article.slug)
+                continue
+            self.stdout.write(f"{compiled['source_hash']}  {article.slug}")
+
+        if missing:
+            raise CommandError(f"No markdown for: {', '.join(missing)} (looked in {settings.ARTICLES['SOURCE_DIR']})")
+        self.stdout.write(self.style.SUCCESS('Articles compiled'))
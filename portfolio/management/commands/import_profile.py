@@ -0,0 +1,65 @@
+"""
+Import Profile
+Starts a fresh interpreter with -X importtime, loads the WSGI app and URLs the way a worker would,
+and reports the slowest imports plus the child's peak memory
+
+    python manage.py import_profile
+    python manage.py import_profile --top 40 --module portfolio.services.email
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+import os
+import resource
+import subprocess
+import sys
+
+
+class Command(BaseCommand):
+    help = 'Profiles import time and memory of a cold worker start using python -X importtime'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help='how many imports to list')
+        parser.add_argument('--sort', choices=['cumulative', 'self'], default='cumulative')
+        parser.add_argument('--module', action='append', default=[],
+                            help='extra module to import after the WSGI app, e.g. a lazily loaded one')
+
+    def handle(self, *args, **options):
+        # urls pulls in the views, which a worker would otherwise import on its first request
+        imports = ['import website_project.wsgi', f"import {settings.ROOT_URLCONF}"] + [f"import {m}" for m in options['module']]
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'website_project.settings')}
+
+        before = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', '; '.join(imports)],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        peak_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+        rows = parse_importtime(result.stderr)
+        if result.returncode != 0 or not rows:
+            raise CommandError(f"Import failed:\n{result.stderr[-2000:]}")
+
+        key = 1 if options['sort'] == 'self' else 2
+        total_us = sum(row[1] for row in rows)
+
+        self.stdout.write(f"{'self ms':>10}{'cumul ms':>10}  module")
+        for module, self_us, cumulative_us in sorted(rows, key=lambda r: r[key], reverse=True)[:options['top']]:
+            self.stdout.write(f"{self_us / 1000:>10.1f}{cumulative_us / 1000:>10.1f}  {module}")
+
+        self.stdout.write('')
+        self.stdout.write(f"{len(rows)} modules imported in {total_us / 1000:.0f} ms")
+        # ru_maxrss is the biggest child so far, only meaningful if this run set a new peak
+        if peak_rss > before:
+            self.stdout.write(f"Peak RSS of the cold start: {peak_rss / 1024:.1f} MB")
+
+
+def parse_importtime(stderr):
+    """turns '-X importtime' lines into (module, self_us, cumulative_us)"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
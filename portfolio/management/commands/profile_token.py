@@ -0,0 +1,17 @@
+"""
+Profile Token
+Prints a signed header that makes ProfilingMiddleware profile a request
+
+    curl -H "$(python manage.py profile_token)" https://.../projects/ -D - -o /dev/null
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from portfolio.middleware import make_profile_token
+
+
+class Command(BaseCommand):
+    help = 'Prints a signed X-Profile-Token header for profiling a single request'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{settings.PROFILING['HEADER']}: {make_profile_token()}")
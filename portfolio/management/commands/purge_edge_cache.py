@@ -0,0 +1,80 @@
+"""
+Purge Edge Cache
+Works out which content sections changed between two versions of data.py and
+purges only the pages tagged with those sections from the CDN
+
+    python manage.py purge_edge_cache                 # compare against the last purge
+    python manage.py purge_edge_cache --since HEAD~1  # compare against a git revision
+    python manage.py purge_edge_cache --dry-run
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from pathlib import Path
+import json
+import subprocess
+from portfolio import data, views  # noqa: F401 - importing views registers page dependencies
+from portfolio.caching import dependents_of
+from portfolio.services.edge_purge import changed_sections, purge_tags, PurgeError
+
+
+class Command(BaseCommand):
+    help = 'Purges edge-cached pages for content sections that changed since the last purge or a git revision'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='git revision to compare data.py against instead of the manifest')
+        parser.add_argument('--manifest', help='JSON file holding the section versions from the last purge')
+        parser.add_argument('--all', action='store_true', help='purge every section regardless of changes')
+        parser.add_argument('--dry-run', action='store_true', help="show what would be purged without sending anything")
+
+    def handle(self, *args, **options):
+        manifest_path = Path(options['manifest'] or settings.EDGE_CACHE['VERSION_FILE'])
+        current = data.get_section_versions()
+
+        if options['all']:
+            previous = {}
+        elif options['since']:
+            previous = self.versions_at_revision(options['since'])
+        else:
+            previous = self.load_manifest(manifest_path)
+
+        changed = changed_sections(previous, current)
+        if not changed:
+            self.stdout.write('No content sections changed, nothing to purge.')
+            return
+
+        self.stdout.write(f"Changed sections: {', '.join(changed)}")
+        self.stdout.write(f"Affected pages and payloads: {', '.join(dependents_of(changed)) or 'none'}")
+        if options['dry_run']:
+            return
+
+        try:
+            purge_tags(changed)
+        except PurgeError as e:
+            raise CommandError(str(e))
+
+        manifest_path.write_text(json.dumps(current, indent=2, sort_keys=True))
+        self.stdout.write(self.style.SUCCESS(f"Purged {len(changed)} section(s), versions saved to {manifest_path}"))
+
+    def load_manifest(self, path):
+        # no manifest yet means we don't know what's cached, so everything counts as changed
+        if not path.exists():
+            return {}
+        try:
+            return json.loads(path.read_text())
+        except ValueError as e:
+            raise CommandError(f"Couldn't read {path}: {e}")
+
+    def versions_at_revision(self, revision):
+        try:
+            source = subprocess.run(
+                ['git', 'show', f"{revision}:portfolio/data.py"],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise CommandError(f"Couldn't load data.py at {revision}: {e}")
+
+        namespace = {}
+        exec(compile(source, f"data.py@{revision}", 'exec'), namespace)
+        # older versions of data.py won't have hash helpers, so always hash with the current ones
+        return data.get_section_versions(namespace)
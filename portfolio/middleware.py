@@ -0,0 +1,257 @@
+"""
+Portfolio Middleware
+Request-level hooks that wrap every view
+"""
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, JsonResponse
+from django.middleware.gzip import GZipMiddleware
+from django.urls import reverse
+from pathlib import Path
+import cProfile
+import logging
+import random
+import threading
+import time
+import uuid
+from .streaming import compress_flushed
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN_SALT = 'portfolio.profiling'
+
+
+def make_profile_token():
+    """signed value for the profiling header - expires after PROFILING['TOKEN_MAX_AGE'] seconds"""
+    return signing.TimestampSigner(salt=PROFILE_TOKEN_SALT).sign('profile')
+
+
+class ProfilingMiddleware:
+    """
+    Runs a request under cProfile when it carries a header signed with SECRET_KEY,
+    or for a random sample of requests if PROFILING['SAMPLE_RATE'] is set.
+    Writes a .prof file (open with snakeviz, flameprof or pstats) to PROFILING['OUTPUT_DIR']
+    and returns its id in the X-Profile-Id header.
+    Untriggered requests only pay for one dict lookup, so it's fine to leave on in production
+    """
+
+    def __init__(self, get_response):
+        options = settings.PROFILING
+        if not options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = 'HTTP_' + options['HEADER'].upper().replace('-', '_')
+        self.sample_rate = options['SAMPLE_RATE']
+        self.token_max_age = options['TOKEN_MAX_AGE']
+        self.output_dir = Path(options['OUTPUT_DIR'])
+        self.max_files = options['MAX_FILES']
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        profiler = cProfile.Profile()
+        if not self.try_enable(profiler):
+            logger.warning(f"Skipped profiling {request.path}, another request is being profiled")
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+
+        response['X-Profile-Id'] = profile_id
+
+        # streamed pages render while the body is sent, so keep profiling until the last chunk
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.profile_stream(response.streaming_content, profiler, profile_id, request)
+        else:
+            self.save(profiler, profile_id, request)
+        return response
+
+    def should_profile(self, request):
+        token = request.META.get(self.header)
+        if token is not None:
+            try:
+                signing.TimestampSigner(salt=PROFILE_TOKEN_SALT).unsign(token, max_age=self.token_max_age)
+                return True
+            except signing.BadSignature:
+                logger.warning(f"Ignoring bad profiling token for {request.path}")
+                return False
+        return bool(self.sample_rate) and random.random() < self.sample_rate
+
+    def try_enable(self, profiler):
+        # Python 3.12+ only allows one active profiler per process, so with threaded workers
+        # a request that overlaps another profiled one just runs without it
+        try:
+            profiler.enable()
+            return True
+        except ValueError:
+            return False
+
+    def profile_stream(self, chunks, profiler, profile_id, request):
+        iterator = iter(chunks)
+        try:
+            while True:
+                enabled = self.try_enable(profiler)
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    if enabled:
+                        profiler.disable()
+                yield chunk
+        finally:
+            self.save(profiler, profile_id, request)
+
+    def save(self, profiler, profile_id, request):
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            path = self.output_dir / f"{profile_id}.prof"
+            profiler.dump_stats(path)
+            self.prune()
+            logger.info(f"Profiled {request.method} {request.path} -> {path}")
+        except OSError as e:
+            logger.error(f"Couldn't write profile {profile_id}: {e}")
+
+    def prune(self):
+        # keep disk use bounded when sampling is on - oldest profiles go first
+        profiles = sorted(self.output_dir.glob('*.prof'))
+        for old in profiles[:-self.max_files]:
+            old.unlink(missing_ok=True)
+
+
+def queue_time_ms(request, now=None):
+    """how long the request waited before reaching Django, from the proxy's X-Request-Start header (None without one)"""
+    raw = request.META.get('HTTP_X_REQUEST_START') or request.META.get('HTTP_X_QUEUE_START')
+    if not raw:
+        return None
+    try:
+        started = float(raw.strip().removeprefix('t='))
+    except ValueError:
+        return None
+
+    # proxies send seconds, milliseconds or microseconds since the epoch
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    now = time.time() if now is None else now
+    return max(0.0, (now - started) * 1000)
+
+
+class ConcurrencyBudget:
+    """in-flight limit for one class of request"""
+
+    def __init__(self, name, max_in_flight, max_queue_ms):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue_ms = max_queue_ms
+        self.in_flight = 0
+        self.shed = 0
+        self._lock = threading.Lock()
+
+    def try_enter(self):
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def count_shed(self):
+        """one more request turned away, returns the total so far"""
+        with self._lock:
+            self.shed += 1
+            return self.shed
+
+
+class LoadSheddingMiddleware:
+    """
+    Answers with a quick 503 + Retry-After once a worker is over its limits, instead of letting
+    requests queue until they time out. Two separate budgets so a burst of contact form posts
+    or downloads can't take every thread away from the pages:
+      - in-flight requests per process, EXPENSIVE_VIEWS have their own much smaller limit
+      - time spent queued in front of Django, if the proxy sends X-Request-Start
+    Static files are answered by WhiteNoise before this runs, so they're never shed
+    """
+
+    def __init__(self, get_response):
+        options = settings.LOAD_SHEDDING
+        if not options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.retry_after = str(options['RETRY_AFTER'])
+        self.pages = ConcurrencyBudget('pages', options['MAX_IN_FLIGHT'], options['MAX_QUEUE_MS'])
+        self.expensive = ConcurrencyBudget(
+            'expensive', options['EXPENSIVE_MAX_IN_FLIGHT'], options['EXPENSIVE_MAX_QUEUE_MS'],
+        )
+        self.expensive_views = options['EXPENSIVE_VIEWS']
+        self._expensive_paths = None
+        self._last_warning = 0.0
+
+    def expensive_paths(self):
+        # worked out on first use, the URLconf might not be importable yet when middleware loads
+        if self._expensive_paths is None:
+            self._expensive_paths = frozenset(reverse(name) for name in self.expensive_views)
+        return self._expensive_paths
+
+    def __call__(self, request):
+        budget = self.expensive if request.path in self.expensive_paths() else self.pages
+
+        queued = queue_time_ms(request)
+        if queued is not None and queued > budget.max_queue_ms:
+            return self.shed(request, budget, f"queued for {queued:.0f}ms")
+        if not budget.try_enter():
+            return self.shed(request, budget, f"{budget.max_in_flight} already in flight")
+
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            budget.leave()
+            raise
+
+        # the slot is held until the server closes the response - streamed pages render while they're sent
+        response._resource_closers.append(budget.leave)
+        return response
+
+    def shed(self, request, budget, reason):
+        shed = budget.count_shed()
+        # one line every few seconds is plenty when hundreds of requests are being turned away
+        now = time.monotonic()
+        if now - self._last_warning >= 5:
+            self._last_warning = now
+            logger.warning(f"Shedding {budget.name} requests ({reason}), {shed} shed so far")
+
+        message = 'The site is very busy right now, please try again in a moment.'
+        if request.content_type == 'application/json':
+            response = JsonResponse({'success': False, 'message': message}, status=503)
+        else:
+            response = HttpResponse(message, status=503, content_type='text/plain; charset=utf-8')
+        response['Retry-After'] = self.retry_after
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
+class StreamingGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that keeps the early flush of streamed pages - Django's own buffers the
+    whole compressed page before sending any of it. Everything else is left to the parent class
+    """
+
+    def process_response(self, request, response):
+        if not response.streaming or response.is_async or response.has_header('Content-Encoding'):
+            return super().process_response(request, response)
+
+        chunks = response.streaming_content
+        response = super().process_response(request, response)
+        if response.get('Content-Encoding') == 'gzip':
+            # same headers as the parent set, just a compressor that flushes every chunk
+            response.streaming_content = compress_flushed(chunks, max_random_bytes=self.max_random_bytes)
+        return response
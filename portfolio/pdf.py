@@ -0,0 +1,151 @@
+"""
+PDF Writer
+Just enough PDF for a text-only document like the CV - wrapped paragraphs, bullets and rules on
+A4 pages in the built-in Helvetica fonts, so nothing gets embedded and the file stays a few KB.
+Output only depends on what's written to it (no timestamps), so the same content gives the same bytes
+"""
+
+import zlib
+
+PAGE_WIDTH = 595.28
+PAGE_HEIGHT = 841.89
+MARGIN = 50
+
+FONTS = {False: 'F1', True: 'F2'}
+FONT_NAMES = {'F1': 'Helvetica', 'F2': 'Helvetica-Bold'}
+
+# glyph widths (per 1000 em) for characters 32-126, from the standard Helvetica metrics
+HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+HELVETICA_BOLD_WIDTHS = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+)
+DEFAULT_WIDTH = 556
+
+# the standard fonts only cover Windows-1252, so anything outside it gets a stand-in
+REPLACEMENTS = str.maketrans({'→': '->', '←': '<-', '≥': '>=', '≤': '<=', '✓': '-', '◆': '-'})
+
+
+def text_width(text, size, bold=False):
+    widths = HELVETICA_BOLD_WIDTHS if bold else HELVETICA_WIDTHS
+    total = sum(widths[ord(c) - 32] if 32 <= ord(c) <= 126 else DEFAULT_WIDTH for c in text)
+    return total * size / 1000
+
+
+def wrap(text, size, bold, width):
+    """greedy word wrap to a width in points"""
+    lines, line = [], ''
+    for word in text.split():
+        candidate = f"{line} {word}" if line else word
+        if line and text_width(candidate, size, bold) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines
+
+
+def encode(text):
+    raw = text.translate(REPLACEMENTS).encode('cp1252', 'replace')
+    return raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+class PDFWriter:
+    def __init__(self, title='', author=''):
+        self.title = title
+        self.author = author
+        self.pages = []
+        self.new_page()
+
+    def new_page(self):
+        self.ops = []
+        self.pages.append(self.ops)
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def make_room(self, height):
+        if self.y - height < MARGIN:
+            self.new_page()
+
+    def space(self, points):
+        self.y -= points
+
+    def text(self, text, size=10, bold=False, gray=0.0, indent=0, bullet=False, line_height=1.35):
+        """a wrapped paragraph, starting on a new page if there's no room for its first line"""
+        x = MARGIN + indent + (10 if bullet else 0)
+        leading = size * line_height
+        for number, line in enumerate(wrap(text, size, bold, PAGE_WIDTH - MARGIN - x)):
+            self.make_room(leading)
+            self.y -= leading
+            if bullet and number == 0:
+                self.draw(MARGIN + indent, '•', size, bold, gray)
+            self.draw(x, line, size, bold, gray)
+
+    def draw(self, x, text, size, bold, gray):
+        self.ops.append(
+            f"BT /{FONTS[bold]} {size} Tf {gray:.2f} g {x:.2f} {self.y:.2f} Td (".encode('ascii')
+            + encode(text) + b") Tj ET"
+        )
+
+    def rule(self, gray=0.75):
+        self.make_room(4)
+        self.y -= 4
+        self.ops.append(f"{gray:.2f} G 0.5 w {MARGIN} {self.y:.2f} m {PAGE_WIDTH - MARGIN:.2f} {self.y:.2f} l S".encode('ascii'))
+
+    def render(self):
+        objects = []
+
+        def add(body):
+            objects.append(body)
+            return len(objects)
+
+        def stream(content):
+            compressed = zlib.compress(content, 9)
+            return b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(compressed) + compressed + b"\nendstream"
+
+        catalog = add(None)
+        pages = add(None)
+        fonts = ' '.join(
+            f"/{key} {add(f'<< /Type /Font /Subtype /Type1 /BaseFont /{name} /Encoding /WinAnsiEncoding >>'.encode('ascii'))} 0 R"
+            for key, name in FONT_NAMES.items()
+        )
+        info = add(b"<< /Title (" + encode(self.title) + b") /Author (" + encode(self.author) + b") >>")
+
+        page_ids = []
+        for ops in self.pages:
+            content = add(stream(b'\n'.join(ops)))
+            page_ids.append(add((
+                f"<< /Type /Page /Parent {pages} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                f"/Resources << /Font << {fonts} >> >> /Contents {content} 0 R >>"
+            ).encode('ascii')))
+
+        kids = ' '.join(f"{page} 0 R" for page in page_ids)
+        objects[catalog - 1] = f"<< /Type /Catalog /Pages {pages} 0 R >>".encode('ascii')
+        objects[pages - 1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode('ascii')
+
+        output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(len(output))
+            output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+        xref = len(output)
+        output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        output += b''.join(b"%010d 00000 n \n" % offset for offset in offsets)
+        output += (
+            b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(objects) + 1, catalog, info, xref)
+        )
+        return bytes(output)
@@ -0,0 +1,49 @@
+"""
+Service Worker
+Builds the precache list for /sw.js from the collectstatic manifest plus the main pages.
+The version is a hash of everything in the list and the content in data.py, so a deploy that
+changes either gets a fresh cache and the old one is thrown away
+"""
+
+from functools import lru_cache
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.urls import reverse
+from . import data
+
+# every page in the menu, since main.js prefetches them through the worker on hover
+PRECACHE_PAGES = ('portfolio:home', 'portfolio:about', 'portfolio:projects', 'portfolio:education', 'portfolio:articles')
+
+# pages with a form carry the visitor's CSRF token, so they always come from the network while
+# there is one - the precached copy is only for when it's down
+NETWORK_FIRST_PAGES = ('portfolio:home',)
+
+# documents are megabytes each and only wanted on click, so they stay out - of the precache
+# and of the worker's runtime cache too (see service_worker.js)
+PRECACHE_DIRS = ('css/', 'js/', 'images/')
+
+
+def manifest_assets():
+    """hashed urls from staticfiles.json - empty without a manifest (runserver, tests)"""
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    return sorted(
+        staticfiles_storage.base_url + hashed_name
+        for name, hashed_name in hashed_files.items()
+        if name.startswith(PRECACHE_DIRS)
+    )
+
+
+@lru_cache(maxsize=1)
+def precache_manifest():
+    """(version, page urls, asset urls) for the service worker - only worked out once per process"""
+    pages = [reverse(name) for name in PRECACHE_PAGES]
+    assets = manifest_assets()
+    version = data.hash_content({
+        'pages': pages,
+        'assets': assets,
+        'content': data.current_section_versions(),
+    })
+    return version, pages, assets
+
+
+def network_first_urls():
+    return [reverse(name) for name in NETWORK_FIRST_PAGES]
@@ -0,0 +1,53 @@
+"""
+Edge Cache Purging
+Sends targeted purge-by-tag requests to the CDN so only pages built from changed
+content get thrown away. Uses the shared pooled client from http.py
+"""
+
+from django.conf import settings
+import logging
+from .http import get_client, OutboundHTTPError
+
+logger = logging.getLogger(__name__)
+
+
+class PurgeError(Exception):
+    """Raised when the CDN doesn't accept a purge request"""
+
+
+def changed_sections(previous_versions, current_versions):
+    """compares two {section: hash} dicts and returns the sections that differ, in a stable order"""
+    sections = set(previous_versions) | set(current_versions)
+    return sorted(s for s in sections if previous_versions.get(s) != current_versions.get(s))
+
+
+def build_purge_body(tags):
+    """request body for the configured CDN - Cloudflare wants 'tags', Fastly 'surrogate_keys'"""
+    purge_format = settings.EDGE_CACHE['PURGE_FORMAT']
+    if purge_format not in ('tags', 'surrogate_keys'):
+        raise PurgeError(f"Unknown EDGE_PURGE_FORMAT: {purge_format}")
+    return {purge_format: list(tags)}
+
+
+def purge_tags(tags):
+    """asks the CDN to drop every cached page tagged with any of these tags"""
+    if not tags:
+        return
+
+    purge_url = settings.EDGE_CACHE['PURGE_URL']
+    if not purge_url:
+        raise PurgeError("EDGE_PURGE_URL is not configured")
+
+    headers = {}
+    if settings.EDGE_CACHE['PURGE_TOKEN']:
+        headers['Authorization'] = f"Bearer {settings.EDGE_CACHE['PURGE_TOKEN']}"
+
+    try:
+        response = get_client().post(purge_url, headers=headers, json=build_purge_body(tags))
+    except OutboundHTTPError as e:
+        raise PurgeError(f"Purge request failed: {e}") from e
+
+    if not response.ok:
+        raise PurgeError(f"Purge rejected with HTTP {response.status}: {response.content[:200]!r}")
+
+    logger.info(f"Purged edge cache tags: {', '.join(tags)}")
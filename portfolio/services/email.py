@@ -0,0 +1,63 @@
+"""
+Contact Email
+Sends contact form messages through Resend using the shared pooled HTTP client
+so repeat sends reuse the same keep-alive connection to api.resend.com
+"""
+
+from django.conf import settings
+import threading
+from .http import get_client, OutboundHTTPError
+
+# resend (and requests under it) is only imported on the first send - it's slow to import
+# and most workers never handle a contact form submission
+
+
+class PooledResendClient:
+    """
+    Plugs our pooled client into the Resend SDK in place of its per-call requests client.
+    Same request() signature as resend.http_client.HTTPClient, just not subclassed so
+    resend doesn't get imported with this module
+    """
+
+    def request(self, method, url, headers, json=None, files=None, data=None):
+        if files is not None or data is not None:
+            raise RuntimeError("Pooled Resend client only sends JSON bodies")
+        try:
+            response = get_client().request(method.upper(), url, headers=dict(headers), json=json)
+        except OutboundHTTPError as e:
+            # Resend wraps RuntimeError into its own ResendError
+            raise RuntimeError(f"Request failed: {e}") from e
+        return response.content, response.status, response.headers
+
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure_resend():
+    """imports resend and sets its API key and HTTP client, once per process"""
+    global _configured
+    import resend
+    if _configured:
+        return resend
+    with _configure_lock:
+        if not _configured:
+            resend.api_key = settings.RESEND_API_KEY
+            resend.default_http_client = PooledResendClient()
+            _configured = True
+    return resend
+
+
+def send_contact_email(name, email, subject, message):
+    """sends a contact form message to my inbox, returns True if Resend accepted it"""
+    if not settings.RESEND_API_KEY:
+        return False
+
+    resend = configure_resend()
+    resend.Emails.send({
+        "from": "Portfolio Contact <onboarding@resend.dev>",
+        "to": "andrewjem8@gmail.com",
+        "subject": f"Portfolio Contact: {subject}",
+        "text": f"From: {name}\nEmail: {email}\n\n{message}"
+    })
+    return True
@@ -0,0 +1,352 @@
+"""
+Outbound HTTP
+One shared client for every call the site makes to other services (Resend, GitHub etc.)
+Keeps connections open between calls so we don't pay for a TLS handshake every time,
+caps how many requests can hit one host at once and stops calling a host that keeps failing
+"""
+
+from collections import deque
+from urllib.parse import urlsplit
+import http.client
+import json as jsonlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# safe to send twice - a dead keep-alive connection might have got the first attempt through
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'})
+
+
+# Errors
+
+class OutboundHTTPError(Exception):
+    """Base error for anything that goes wrong talking to another service"""
+
+
+class CircuitOpenError(OutboundHTTPError):
+    """Raised straight away when a host has failed too often recently"""
+
+
+class PoolTimeoutError(OutboundHTTPError):
+    """Raised when all connections to a host are busy for too long"""
+
+
+class Response:
+    """What comes back from a request - body is already fully read"""
+    def __init__(self, status, headers, content):
+        self.status = status
+        self.headers = headers
+        self.content = content
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 400
+
+    def json(self):
+        return jsonlib.loads(self.content or b'null')
+
+
+# Circuit breaker
+
+class CircuitBreaker:
+    """
+    Counts failures in a row for one host.
+    closed -> normal, open -> fail fast, half-open -> let one request through to test the water
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def before_request(self):
+        with self._lock:
+            state = self.state
+            if state == 'open':
+                return False
+            if state == 'half-open':
+                # only one trial request at a time while we find out if the host is back
+                if self.trial_in_flight:
+                    return False
+                self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def abort(self):
+        # request never reached the host so it tells us nothing either way
+        with self._lock:
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+# Latency metrics
+
+class HostMetrics:
+    """Rolling latency numbers for one host - keeps the last few hundred samples"""
+    def __init__(self, sample_size=500):
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.samples = deque(maxlen=sample_size)
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_ms, error=False):
+        with self._lock:
+            self.requests += 1
+            if error:
+                self.errors += 1
+            self.samples.append(elapsed_ms)
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def record_connection(self, reused):
+        with self._lock:
+            if reused:
+                self.connections_reused += 1
+            else:
+                self.connections_opened += 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self.samples)
+            stats = {
+                'requests': self.requests,
+                'errors': self.errors,
+                'rejected': self.rejected,
+                'connections_opened': self.connections_opened,
+                'connections_reused': self.connections_reused,
+            }
+        if samples:
+            stats.update({
+                'avg_ms': round(sum(samples) / len(samples), 2),
+                'p50_ms': round(percentile(samples, 50), 2),
+                'p95_ms': round(percentile(samples, 95), 2),
+                'max_ms': round(samples[-1], 2),
+            })
+        return stats
+
+
+def percentile(sorted_samples, pct):
+    """nearest-rank percentile of an already sorted list"""
+    index = max(0, int(round(pct / 100 * len(sorted_samples))) - 1)
+    return sorted_samples[min(index, len(sorted_samples) - 1)]
+
+
+# Connection pool for a single host
+
+class HostPool:
+    """Idle keep-alive connections for one scheme://host:port plus its limits"""
+    def __init__(self, scheme, host, port, max_connections, timeout, breaker):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.breaker = breaker
+        self.metrics = HostMetrics()
+        self.idle = deque()
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+
+    def acquire(self, wait):
+        if not self.slots.acquire(timeout=wait):
+            self.metrics.record_rejected()
+            raise PoolTimeoutError(f"No free connection to {self.host} after {wait}s")
+
+        with self._lock:
+            conn = self.idle.pop() if self.idle else None
+
+        self.metrics.record_connection(reused=conn is not None)
+        if conn is not None:
+            return conn, True
+
+        conn_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        return conn_class(self.host, self.port, timeout=self.timeout), False
+
+    def release(self, conn, reusable):
+        if reusable:
+            with self._lock:
+                self.idle.append(conn)
+        else:
+            conn.close()
+        self.slots.release()
+
+    def close(self):
+        with self._lock:
+            while self.idle:
+                self.idle.pop().close()
+
+
+# The client
+
+class HTTPClient:
+    """
+    Thread-safe pooled client. One instance per process is plenty - use get_client().
+    Only retries when a reused keep-alive connection turned out to be dead, and only for
+    IDEMPOTENT_METHODS - the server may have got a POST before dropping the connection, and a
+    second copy would send the contact email twice.
+    """
+    def __init__(self, timeout=10, max_connections_per_host=4, pool_wait=5,
+                 failure_threshold=5, reset_timeout=30, user_agent='jemandrew-portfolio'):
+        self.timeout = timeout
+        self.max_connections_per_host = max_connections_per_host
+        self.pool_wait = pool_wait
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.user_agent = user_agent
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self, scheme, host, port):
+        key = (scheme, host, port)
+        pool = self._pools.get(key)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(key)
+                if pool is None:
+                    breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                    pool = HostPool(scheme, host, port, self.max_connections_per_host, self.timeout, breaker)
+                    self._pools[key] = pool
+        return pool
+
+    def request(self, method, url, headers=None, body=None, json=None, timeout=None):
+        """sends a request and returns a Response, raises OutboundHTTPError on failure"""
+        parts = urlsplit(url)
+        scheme = parts.scheme or 'https'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        path = parts.path or '/'
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        pool = self._get_pool(scheme, parts.hostname, port)
+        if not pool.breaker.before_request():
+            pool.metrics.record_rejected()
+            raise CircuitOpenError(f"Circuit open for {parts.hostname}, skipping request")
+
+        request_headers = {'User-Agent': self.user_agent, 'Connection': 'keep-alive'}
+        request_headers.update(headers or {})
+        if json is not None:
+            body = jsonlib.dumps(json).encode('utf-8')
+            request_headers.setdefault('Content-Type', 'application/json')
+        elif isinstance(body, str):
+            body = body.encode('utf-8')
+
+        started = time.perf_counter()
+        try:
+            response = self._send(pool, method, path, request_headers, body, timeout)
+        except PoolTimeoutError:
+            pool.breaker.abort()
+            raise
+        except OutboundHTTPError as e:
+            pool.breaker.record_failure()
+            pool.metrics.record((time.perf_counter() - started) * 1000, error=True)
+            logger.warning(f"Outbound request failed ({pool.breaker.state} circuit): {e}")
+            raise
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        # 5xx means the host is struggling - 4xx is our fault so doesn't count against it
+        if response.status >= 500:
+            pool.breaker.record_failure()
+            pool.metrics.record(elapsed_ms, error=True)
+        else:
+            pool.breaker.record_success()
+            pool.metrics.record(elapsed_ms)
+        return response
+
+    def _send(self, pool, method, path, headers, body, timeout):
+        for attempt in range(2):
+            conn, reused = pool.acquire(self.pool_wait)
+            conn.timeout = timeout or self.timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(conn.timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                raw = conn.getresponse()
+                content = raw.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as e:
+                pool.release(conn, reusable=False)
+                # server closed an idle keep-alive connection on us - try once on a fresh one
+                if reused and attempt == 0 and method in IDEMPOTENT_METHODS:
+                    continue
+                raise OutboundHTTPError(f"{method} {pool.host}{path} failed: {e}") from e
+            except (OSError, http.client.HTTPException) as e:
+                pool.release(conn, reusable=False)
+                raise OutboundHTTPError(f"{method} {pool.host}{path} failed: {e}") from e
+
+            pool.release(conn, reusable=not raw.will_close)
+            return Response(raw.status, dict(raw.getheaders()), content)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def metrics(self):
+        """latency and connection stats per host, for logging or a debug page"""
+        with self._lock:
+            pools = list(self._pools.values())
+        stats = {}
+        for pool in pools:
+            host_stats = pool.metrics.snapshot()
+            host_stats['circuit'] = pool.breaker.state
+            host_stats['idle_connections'] = len(pool.idle)
+            stats[f"{pool.scheme}://{pool.host}:{pool.port}"] = host_stats
+        return stats
+
+    def close(self):
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools = {}
+        for pool in pools:
+            pool.close()
+
+
+# Shared instance
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """returns the process-wide client, built from OUTBOUND_HTTP in settings"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from django.conf import settings
+                options = getattr(settings, 'OUTBOUND_HTTP', {})
+                _client = HTTPClient(
+                    timeout=options.get('TIMEOUT', 10),
+                    max_connections_per_host=options.get('MAX_CONNECTIONS_PER_HOST', 4),
+                    pool_wait=options.get('POOL_WAIT', 5),
+                    failure_threshold=options.get('CIRCUIT_FAILURE_THRESHOLD', 5),
+                    reset_timeout=options.get('CIRCUIT_RESET_TIMEOUT', 30),
+                )
+    return _client
@@ -0,0 +1,137 @@
+"""
+Stub Server
+Tiny local HTTP/1.1 server for testing outbound integrations without hitting the real APIs
+Speaks keep-alive like the real thing so connection reuse can be checked too
+
+    with StubServer() as stub:
+        stub.add_route('POST', '/emails', status=200, json={'id': 'abc'})
+        get_client().post(stub.url('/emails'), json={...})
+        stub.requests  # everything that came in
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json as jsonlib
+import socket
+import sys
+import threading
+import time
+
+
+class StubRequest:
+    """One request the stub received"""
+    def __init__(self, method, path, headers, body):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return jsonlib.loads(self.body or b'null')
+
+
+class QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients hanging up on a keep-alive connection is normal, not worth a traceback in the test output
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubServer:
+    """Local server on a random free port, runs in a background thread"""
+
+    def __init__(self, host='127.0.0.1'):
+        self.host = host
+        self.routes = {}
+        self.requests = []
+        self.connections = 0
+        self._sockets = set()
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def add_route(self, method, path, status=200, json=None, body=b'', headers=None, delay=0):
+        """registers a canned response, json wins over body if both given"""
+        if json is not None:
+            body = jsonlib.dumps(json).encode('utf-8')
+            headers = {'Content-Type': 'application/json', **(headers or {})}
+        self.routes[(method.upper(), path)] = (status, headers or {}, body, delay)
+
+    def url(self, path='/'):
+        return f"http://{self.host}:{self.port}{path}"
+
+    def drop_connections(self):
+        """closes every open connection from the server end, like a server timing out idle keep-alives"""
+        with self._lock:
+            sockets = list(self._sockets)
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+                    stub._sockets.add(self.connection)
+
+            def finish(self):
+                with stub._lock:
+                    stub._sockets.discard(self.connection)
+                super().finish()
+
+            def handle_any(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                with stub._lock:
+                    stub.requests.append(StubRequest(self.command, self.path, dict(self.headers), body))
+
+                status, headers, response_body, delay = stub.routes.get(
+                    (self.command, self.path.split('?')[0]),
+                    (404, {}, b'not found', 0),
+                )
+                if delay:
+                    time.sleep(delay)
+
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(response_body)))
+                self.end_headers()
+                self.wfile.write(response_body)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = handle_any
+
+            def log_message(self, format, *args):
+                # keep test output quiet
+                pass
+
+        self._server = QuietServer((self.host, 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,163 @@
+"""
+Single Flight
+Cache lookups where concurrent misses for the same key wait on one computation instead of
+each recomputing it - after a deploy, an expiry or a content change the first request does
+the work and the rest get its result. Entries also carry how long they took to compute, so
+one request refreshes a hot key a little before it expires (XFetch style early refresh)
+while everyone else keeps getting the cached copy
+"""
+
+from collections import namedtuple
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+import logging
+import math
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# what actually goes in the cache - delta is how long compute took, expires is a timestamp or None
+Entry = namedtuple('Entry', ['value', 'delta', 'expires'])
+
+# key -> Flight for computations in progress in this process
+_flights = {}
+_flights_lock = threading.Lock()
+
+POLL_INTERVAL = 0.05
+
+
+def lock_key(key):
+    return f"singleflight:{key}"
+
+
+class Flight:
+    """one computation of a key that other requests can wait on"""
+
+    def __init__(self, key):
+        self.key = key
+        self.value = None
+        self.holds_lock = False
+        self.started = time.monotonic()
+        self._done = threading.Event()
+
+    def is_stale(self):
+        # a leader that's been at it longer than anyone would wait has died or hung
+        return time.monotonic() - self.started > settings.SINGLE_FLIGHT['WAIT_TIMEOUT']
+
+    def wait(self, timeout=None):
+        """the leader's value, None if it failed or took longer than timeout"""
+        timeout = settings.SINGLE_FLIGHT['WAIT_TIMEOUT'] if timeout is None else timeout
+        self._done.wait(timeout)
+        return self.value
+
+    def land(self, value=None):
+        """hands value to anyone waiting - only the first call counts, so it's safe to call again on cleanup"""
+        with _flights_lock:
+            if self._done.is_set():
+                return
+            if _flights.get(self.key) is self:
+                del _flights[self.key]
+            self.value = value
+            self._done.set()
+        if self.holds_lock:
+            cache.delete(lock_key(self.key))
+
+
+def join(key, wait=True):
+    """
+    (flight, leading) - leading is True for the one caller that should compute key, everyone
+    else waits on the flight. Other processes are kept out with a lock in the shared cache;
+    if one of them is already computing, this waits for its result to show up (or gives up
+    straight away when wait=False, e.g. when there's a cached copy to fall back on)
+    """
+    with _flights_lock:
+        stale = _flights.get(key)
+        if stale is not None and not stale.is_stale():
+            return stale, False
+        flight = _flights[key] = Flight(key)
+
+    if stale is not None and stale.holds_lock:
+        # the lock was this process's own, nobody else is going to release it
+        cache.delete(lock_key(key))
+
+    if cache.add(lock_key(key), 1, settings.SINGLE_FLIGHT['LOCK_TIMEOUT']):
+        flight.holds_lock = True
+        return flight, True
+    if not wait:
+        flight.land()
+        return flight, False
+
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT['WAIT_TIMEOUT']
+    while time.monotonic() < deadline:
+        entry = get_entry(key)
+        if entry is not None:
+            flight.land(entry.value)
+            return flight, False
+        time.sleep(POLL_INTERVAL)
+    # the other process is stuck or died holding the lock, don't leave this request hanging
+    logger.warning(f"Gave up waiting on another process for {key}, computing it here")
+    return flight, True
+
+
+# Cache entries
+
+def get_entry(key):
+    entry = cache.get(key)
+    # anything else is from before entries were wrapped, treat it as a miss
+    return entry if isinstance(entry, Entry) else None
+
+
+def set_entry(key, value, delta, timeout=DEFAULT_TIMEOUT):
+    if timeout is DEFAULT_TIMEOUT:
+        timeout = cache.default_timeout
+    expires = time.time() + timeout if timeout is not None else None
+    cache.set(key, Entry(value, delta, expires), timeout)
+
+
+def should_refresh(entry):
+    """
+    True now and then as expiry gets close - the slower the value is to compute the earlier it
+    starts, so with steady traffic the key is rebuilt by one request before it ever goes missing
+    """
+    beta = settings.SINGLE_FLIGHT['EARLY_REFRESH_BETA']
+    if entry.expires is None or not beta:
+        return False
+    # 1 - random() is in (0, 1] so log() never sees a zero
+    return time.time() - entry.delta * beta * math.log(1.0 - random.random()) >= entry.expires
+
+
+def get_or_compute(key, compute, timeout=DEFAULT_TIMEOUT):
+    """
+    compute() from the cache, computed by one caller at a time however many miss together.
+    compute() shouldn't return None, that's what a miss looks like
+    """
+    entry = get_entry(key)
+    if entry is not None and not should_refresh(entry):
+        return entry.value
+
+    flight, leading = join(key, wait=entry is None)
+    if not leading:
+        if entry is not None:
+            # someone else is already refreshing it, the cached copy is still good
+            return entry.value
+        value = flight.wait()
+        if value is not None:
+            return value
+        # the leader failed or is taking too long, work it out here instead
+        return compute()
+
+    try:
+        started = time.monotonic()
+        value = compute()
+        set_entry(key, value, time.monotonic() - started, timeout)
+    except Exception:
+        flight.land()
+        if entry is None:
+            raise
+        logger.exception(f"Early refresh of {key} failed, keeping the cached copy")
+        return entry.value
+    flight.land(value)
+    return value
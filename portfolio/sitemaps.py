@@ -0,0 +1,54 @@
+"""
+Sitemaps
+sitemap.xml for crawlers - the main pages plus one entry per project and article
+"""
+
+from django.contrib.sitemaps import Sitemap
+from django.urls import reverse
+from . import data
+
+
+class PageSitemap(Sitemap):
+    changefreq = 'monthly'
+    priority = 0.8
+
+    def items(self):
+        return ['portfolio:home', 'portfolio:about', 'portfolio:projects', 'portfolio:education', 'portfolio:articles']
+
+    def location(self, item):
+        return reverse(item)
+
+
+class ProjectSitemap(Sitemap):
+    changefreq = 'monthly'
+    priority = 0.6
+
+    def items(self):
+        return data.get_all_projects()
+
+    def location(self, item):
+        return reverse('portfolio:project_detail', args=[item.slug])
+
+    def lastmod(self, item):
+        return item.created_date
+
+
+class ArticleSitemap(Sitemap):
+    changefreq = 'yearly'
+    priority = 0.6
+
+    def items(self):
+        return data.get_all_articles()
+
+    def location(self, item):
+        return reverse('portfolio:article_detail', args=[item.slug])
+
+    def lastmod(self, item):
+        return item.published
+
+
+SITEMAPS = {
+    'pages': PageSitemap,
+    'projects': ProjectSitemap,
+    'articles': ArticleSitemap,
+}
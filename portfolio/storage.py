@@ -0,0 +1,107 @@
+"""
+Static Files Storage
+WhiteNoise's compressed manifest storage, but compression only happens for content it hasn't
+seen before. Every compressed file is recorded by content hash in staticfiles.compressed.json,
+so a rebuild into the same STATIC_ROOT reuses the .gz/.br files for anything unchanged and
+compresses the rest in parallel, one process per core
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from whitenoise.compress import Compressor
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+import hashlib
+import json
+import os
+import shutil
+
+# docx files are zip archives already, compressing them again is slow and never saves anything
+SKIP_COMPRESS_EXTENSIONS = Compressor.SKIP_COMPRESS_EXTENSIONS + ('docx',)
+
+
+def compress_path(path):
+    """runs in a worker process - returns the suffixes written, e.g. ['.br', '.gz']"""
+    return [compressed[len(path):] for compressed in Compressor(quiet=True).compress(path)]
+
+
+class IncrementalCompressedStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    compressed_manifest_name = 'staticfiles.compressed.json'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compressed_count = 0
+        self.reused_count = 0
+
+    def skip_extensions(self):
+        return getattr(settings, 'WHITENOISE_SKIP_COMPRESS_EXTENSIONS', None) or SKIP_COMPRESS_EXTENSIONS
+
+    def compress_files(self, names):
+        self.compressed_count = self.reused_count = 0
+        compressor = self.create_compressor(extensions=self.skip_extensions(), quiet=True)
+        previous = self.load_compressed_manifest()
+        compressed = {}
+
+        # content hash -> a file whose compressed versions are already on disk
+        done = {
+            entry['digest']: (name, entry['suffixes'])
+            for name, entry in previous.items()
+            if all(self.exists(name + suffix) for suffix in entry['suffixes'])
+        }
+
+        # the original and hashed copy of a file usually have the same content, so group by it
+        todo = {}
+        for name in sorted(names):
+            if not compressor.should_compress(name):
+                continue
+            digest = self.file_digest(name)
+            if digest in done:
+                source, suffixes = done[digest]
+                if source != name:
+                    self.copy_variants(source, name, suffixes)
+                self.reused_count += 1
+                compressed[name] = {'digest': digest, 'suffixes': suffixes}
+                for suffix in suffixes:
+                    yield name, name + suffix
+            else:
+                todo.setdefault(digest, []).append(name)
+
+        results = self.compress_in_parallel([group[0] for group in todo.values()])
+        for (digest, group), suffixes in zip(todo.items(), results):
+            self.compressed_count += 1
+            for name in group:
+                if name != group[0]:
+                    self.copy_variants(group[0], name, suffixes)
+                compressed[name] = {'digest': digest, 'suffixes': suffixes}
+                for suffix in suffixes:
+                    yield name, name + suffix
+
+        self.save_compressed_manifest(compressed)
+
+    def compress_in_parallel(self, names):
+        paths = [self.path(name) for name in names]
+        if len(paths) < 2:
+            return [compress_path(path) for path in paths]
+        with ProcessPoolExecutor(max_workers=min(len(paths), os.cpu_count() or 1)) as pool:
+            return list(pool.map(compress_path, paths))
+
+    def file_digest(self, name):
+        digest = hashlib.sha256()
+        with open(self.path(name), 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def copy_variants(self, source, name, suffixes):
+        for suffix in suffixes:
+            shutil.copyfile(self.path(source + suffix), self.path(name + suffix))
+
+    def load_compressed_manifest(self):
+        try:
+            with open(self.path(self.compressed_manifest_name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_compressed_manifest(self, compressed):
+        with open(self.path(self.compressed_manifest_name), 'w') as f:
+            json.dump(compressed, f, indent=1, sort_keys=True)
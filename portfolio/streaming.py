@@ -0,0 +1,133 @@
+"""
+Streaming Render
+Sends the top of base.html (the <head> with stylesheet and font links, plus the nav)
+as soon as the view has its context, then the content block, then the footer and scripts.
+The browser can start fetching CSS and fonts while the rest of the page is still rendering.
+Works under WSGI and ASGI - under ASGI each chunk is rendered in the sync thread.
+Compressing in Django needs StreamingGZipMiddleware rather than GZipMiddleware, see compress_flushed
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import render
+from django.template import loader
+from django.template.context import make_context
+from django.template.defaulttags import CsrfTokenNode
+from django.template.loader_tags import BLOCK_CONTEXT_KEY, BlockContext, BlockNode, ExtendsNode
+from django.utils.text import StreamingBuffer
+from gzip import GzipFile
+import random
+import string
+import zlib
+
+# blocks in base.html we flush before rendering, so everything above them goes out first
+FLUSH_BEFORE_BLOCKS = ('content',)
+
+
+def render_page(request, template_name, context):
+    """drop-in for render() - streams the page when STREAMING_RENDER is on"""
+    if not settings.STREAMING_RENDER:
+        return render(request, template_name, context)
+    return stream_render(request, template_name, context)
+
+
+def stream_render(request, template_name, context=None, content_type='text/html; charset=utf-8'):
+    """renders template_name as a StreamingHttpResponse, head first"""
+    template = loader.get_template(template_name).template
+
+    # {% csrf_token %} only renders after the CSRF middleware has already looked at the
+    # response, so the cookie has to be set up front or the contact form would break
+    if uses_csrf_token(template):
+        get_token(request)
+
+    chunks = iter_template(template, context or {}, request)
+    if isinstance(request, ASGIRequest):
+        chunks = iterate_in_thread(chunks)
+    return StreamingHttpResponse(chunks, content_type=content_type)
+
+
+def uses_csrf_token(template):
+    return bool(template.nodelist.get_nodes_by_type(CsrfTokenNode))
+
+
+def get_extends_node(template):
+    # {% extends %} has to be the first real tag, so only the top level needs checking
+    for node in template.nodelist:
+        if isinstance(node, ExtendsNode):
+            return node
+    return None
+
+
+def iter_template(template, context_dict, request):
+    """
+    Renders a template that extends a base template as a series of chunks.
+    Does what ExtendsNode.render does but yields between the base template's top-level nodes.
+    Deeper inheritance chains just render in one go
+    """
+    context = make_context(context_dict, request, autoescape=template.engine.autoescape)
+
+    with context.render_context.push_state(template):
+        with context.bind_template(template):
+            context.template_name = template.name
+            extends = get_extends_node(template)
+            parent = extends.get_parent(context) if extends else None
+
+            if parent is None or get_extends_node(parent):
+                yield template._render(context)
+                return
+
+            if BLOCK_CONTEXT_KEY not in context.render_context:
+                context.render_context[BLOCK_CONTEXT_KEY] = BlockContext()
+            block_context = context.render_context[BLOCK_CONTEXT_KEY]
+            block_context.add_blocks(extends.blocks)
+            block_context.add_blocks({n.name: n for n in parent.nodelist.get_nodes_by_type(BlockNode)})
+
+            with context.render_context.push_state(parent, isolated_context=False):
+                buffer = []
+                for node in parent.nodelist:
+                    if isinstance(node, BlockNode) and node.name in FLUSH_BEFORE_BLOCKS and buffer:
+                        yield ''.join(buffer)
+                        buffer = []
+                    buffer.append(node.render_annotated(context))
+                    if isinstance(node, BlockNode) and node.name in FLUSH_BEFORE_BLOCKS:
+                        yield ''.join(buffer)
+                        buffer = []
+                if buffer:
+                    yield ''.join(buffer)
+
+
+async def iterate_in_thread(chunks):
+    """
+    ASGI fallback for sync iterators is to read the whole thing into a list first,
+    which would defeat the point - so pull one chunk at a time in the sync thread instead
+    """
+    finished = object()
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await next_chunk(chunks, finished)
+        if chunk is finished:
+            break
+        yield chunk
+
+
+def compress_flushed(chunks, max_random_bytes=None):
+    """
+    gzips a streamed page chunk by chunk. Django's compress_sequence only yields what zlib
+    hands back, and zlib holds on to everything until its buffer fills - for a page this size
+    that's the end, so the head would go out with the footer. A sync flush after every chunk
+    sends each one as it's rendered, at the cost of a few bytes per chunk
+    """
+    buffer = StreamingBuffer()
+    # a random length file name in the header, same BREACH mitigation as GZipMiddleware
+    filename = None
+    if max_random_bytes:
+        filename = ''.join(random.choices(string.ascii_letters, k=random.randint(1, max_random_bytes))).encode('latin-1')
+    with GzipFile(filename=filename, mode='wb', compresslevel=6, fileobj=buffer, mtime=0) as zfile:
+        for chunk in chunks:
+            zfile.write(chunk)
+            zfile.flush(zlib.Z_SYNC_FLUSH)
+            yield buffer.read()
+    yield buffer.read()
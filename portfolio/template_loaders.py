@@ -0,0 +1,56 @@
+"""
+Template Loaders
+Loaders that minify .html templates as they're read, so under the cached loader the
+indentation and comments are stripped once per process instead of being sent on every page
+"""
+
+from django.template.loaders import app_directories, filesystem
+import re
+
+# <pre>, <script> and <textarea> keep their whitespace, template tags are left exactly as written
+TOKEN_RE = re.compile(
+    r'(?P<keep><(?P<tag>pre|script|textarea)\b.*?</(?P=tag)\s*>|\{%.*?%\}|\{\{.*?\}\}|\{#.*?#\})'
+    r'|(?P<comment><!--.*?-->)',
+    re.DOTALL | re.IGNORECASE,
+)
+NEWLINE_RUN_RE = re.compile(r'\s*\n\s*')
+SPACE_RUN_RE = re.compile(r'[ \t]{2,}')
+
+
+def collapse_whitespace(text):
+    return SPACE_RUN_RE.sub(' ', NEWLINE_RUN_RE.sub('\n', text))
+
+
+def minify_html(source):
+    """collapses whitespace and drops HTML comments, leaving tags and whitespace-sensitive elements alone"""
+    output = []
+    text = []  # text either side of a dropped comment gets collapsed as one run
+    position = 0
+    for match in TOKEN_RE.finditer(source):
+        text.append(source[position:match.start()])
+        position = match.end()
+        comment = match.group('comment')
+        # a comment wrapped around {% %} tags is part of the template structure, so it stays
+        if comment is None or '{%' in comment or comment.startswith('<!--['):
+            output.append(collapse_whitespace(''.join(text)))
+            output.append(match.group())
+            text = []
+    text.append(source[position:])
+    output.append(collapse_whitespace(''.join(text)))
+    return ''.join(output)
+
+
+class MinifyingLoaderMixin:
+    def get_contents(self, origin):
+        contents = super().get_contents(origin)
+        if origin.name.endswith('.html'):
+            return minify_html(contents)
+        return contents
+
+
+class FilesystemLoader(MinifyingLoaderMixin, filesystem.Loader):
+    pass
+
+
+class AppDirectoriesLoader(MinifyingLoaderMixin, app_directories.Loader):
+    pass
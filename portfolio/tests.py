@@ -1,3 +1,897 @@
-from django.test import TestCase
+"""
+Portfolio Tests
+Performance budgets for every view and every data.py helper - budgets live in perf_budgets.json
+so adding a DB query or a much heavier context fails here instead of showing up in production.
+Plus checks for the performance tooling itself (profiling middleware, analytics etc.)
+and a stress test that every view gives the same answer from many threads at once
+"""
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from concurrent.futures import ThreadPoolExecutor
+from decouple import config
+from functools import partial
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+import json
+import pstats
+import re
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+import zipfile
+import zlib
+from . import analytics, articles, cv, data, documents, service_worker, singleflight, urls, views
+from .middleware import ConcurrencyBudget, make_profile_token
+from .services.http import CircuitOpenError, HTTPClient, OutboundHTTPError, PoolTimeoutError
+from .services.stub_server import StubServer
+from .template_loaders import minify_html
+
+BUDGETS = json.loads((Path(__file__).parent / 'perf_budgets.json').read_text())
+
+# manifest storage needs collectstatic to have run, plain storage is fine for tests
+TEST_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# events recorded by any test go to a throwaway database, not the real analytics.sqlite3
+_analytics_override = override_settings(ANALYTICS={
+    **settings.ANALYTICS,
+    'DB_PATH': str(Path(tempfile.mkdtemp()) / 'analytics.sqlite3'),
+})
+
+
+def setUpModule():
+    _analytics_override.enable()
+
+
+def tearDownModule():
+    # flushed while the override is still on, so the atexit flush has nothing left to write
+    analytics.flush()
+    _analytics_override.disable()
+
+# timing is the noisiest number so take the median of a few runs
+TIMING_RUNS = 5
+# the render_ms budgets are for an ordinary dev machine - on a slower or shared one (CI runners)
+# scale them with PERF_BUDGET_TIMING_FACTOR=3, or set it to 0 to report timings without failing on them
+TIMING_FACTOR = config('PERF_BUDGET_TIMING_FACTOR', default=1.0, cast=float)
+
+
+def response_body(response):
+    """the whole body, then closes the response like the server would"""
+    try:
+        if response.streaming:
+            return b''.join(response.streaming_content)
+        return response.content
+    finally:
+        response.close()
+
+
+def measure_memory(func):
+    """runs func once under tracemalloc, returns (peak bytes, new memory blocks still held by the result)"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        result = func()  # noqa: F841 - kept alive so what it allocated shows up in the snapshot
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    new_blocks = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, 'filename'))
+    return peak, new_blocks
+
+
+def measure_time(func):
+    timings = []
+    for _ in range(TIMING_RUNS):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def timing_scaled(budget):
+    """budget with max_render_ms scaled by TIMING_FACTOR, or taken out when timing is only reported"""
+    if 'max_render_ms' not in budget or TIMING_FACTOR == 1:
+        return budget
+    budget = dict(budget)
+    if TIMING_FACTOR:
+        budget['max_render_ms'] = round(budget['max_render_ms'] * TIMING_FACTOR, 2)
+    else:
+        del budget['max_render_ms']
+    return budget
+
+
+def budget_report(label, budget, actual):
+    """table of every metric against its budget, flagging the ones that are over"""
+    lines = [f"Performance budget exceeded for {label}", f"  {'metric':<18}{'budget':>10}{'actual':>12}"]
+    for metric, limit in budget.items():
+        if not metric.startswith('max_'):
+            continue
+        value = actual[metric]
+        line = f"  {metric:<18}{limit:>10}{value:>12}"
+        if value > limit:
+            over = f"+{(value - limit) / limit:.0%}" if limit else 'was 0'
+            line += f"   <-- over ({over})"
+        lines.append(line)
+    lines.append('  (budgets are in portfolio/perf_budgets.json)')
+    if TIMING_FACTOR != 1:
+        lines.append(f"  (render_ms budgets scaled by PERF_BUDGET_TIMING_FACTOR={TIMING_FACTOR:g})")
+    return '\n'.join(lines)
+
+
+class BudgetAssertions:
+    def assertWithinBudget(self, label, budget, actual):
+        budget = timing_scaled(budget)
+        over = [m for m, limit in budget.items() if m.startswith('max_') and actual[m] > limit]
+        if over:
+            self.fail(budget_report(label, budget, actual))
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ViewBudgetTests(BudgetAssertions, TestCase):
+    """every URL in portfolio/urls.py, measured cold so the page cache doesn't hide the real cost"""
+
+    def request(self, name, budget):
+        url = reverse(name, kwargs=budget.get('kwargs'))
+        if budget.get('method') == 'post':
+            return self.client.post(url, data=json.dumps(budget.get('json', {})), content_type='application/json')
+        return self.client.get(url)
+
+    def cold_request(self, name, budget):
+        cache.clear()
+        return response_body(self.request(name, budget))
+
+    def measure_view(self, name, budget):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            body = response_body(self.request(name, budget))
+
+        # warm-up run so one-off costs like template compilation aren't counted against the view
+        self.cold_request(name, budget)
+        peak, new_blocks = measure_memory(lambda: self.cold_request(name, budget))
+        render_ms = measure_time(lambda: self.cold_request(name, budget))
+
+        return {
+            'max_queries': len(queries),
+            'max_peak_kb': round(peak / 1024),
+            'max_new_blocks': new_blocks,
+            'max_render_ms': round(render_ms, 2),
+            'max_response_kb': round(len(body) / 1024, 1),
+        }
+
+    def test_every_view_has_a_budget(self):
+        names = {f"{urls.app_name}:{pattern.name}" for pattern in urls.urlpatterns if pattern.name}
+        missing = names - set(BUDGETS['views'])
+        self.assertFalse(missing, f"No performance budget for: {', '.join(sorted(missing))}")
+
+    def test_views_within_budget(self):
+        for name, budget in BUDGETS['views'].items():
+            with self.subTest(view=name):
+                self.assertWithinBudget(f"view {name}", budget, self.measure_view(name, budget))
+
+
+class DataHelperBudgetTests(BudgetAssertions, TestCase):
+    """every helper in data.py marked with @reads"""
+
+    def helpers(self):
+        return {name: func for name, func in vars(data).items() if callable(func) and hasattr(func, 'sections')}
+
+    def test_every_helper_has_a_budget(self):
+        missing = set(self.helpers()) - set(BUDGETS['data'])
+        self.assertFalse(missing, f"No performance budget for: {', '.join(sorted(missing))}")
+
+    def test_helpers_make_no_queries(self):
+        helpers = self.helpers()
+        for name, budget in BUDGETS['data'].items():
+            with self.subTest(helper=name):
+                with self.assertNumQueries(0):
+                    helpers[name](*budget.get('args', []))
+
+    def test_helpers_within_budget(self):
+        helpers = self.helpers()
+        for name, budget in BUDGETS['data'].items():
+            with self.subTest(helper=name):
+                args = budget.get('args', [])
+                func = partial(helpers[name], *args)
+                func()
+                peak, new_blocks = measure_memory(func)
+                actual = {
+                    'max_peak_kb': round(peak / 1024, 1),
+                    'max_new_blocks': new_blocks,
+                    'max_render_ms': round(measure_time(func), 3),
+                }
+                self.assertWithinBudget(f"data.{name}", budget, actual)
+
+
+class BudgetReportTests(TestCase):
+    def test_report_flags_only_metrics_over_budget(self):
+        report = budget_report('view x', {'max_queries': 0, 'max_peak_kb': 100}, {'max_queries': 2, 'max_peak_kb': 50})
+        lines = report.splitlines()
+        self.assertIn('<-- over (was 0)', next(line for line in lines if 'max_queries' in line))
+        self.assertNotIn('<-- over', next(line for line in lines if 'max_peak_kb' in line))
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        # the profiled request has to actually render, not come out of the page cache
+        cache.clear()
+        self.output_dir = Path(tempfile.mkdtemp())
+        profiling = {**settings.PROFILING, 'OUTPUT_DIR': self.output_dir, 'SAMPLE_RATE': 0.0}
+        self.settings_override = override_settings(PROFILING=profiling)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def test_unsigned_request_is_not_profiled(self):
+        response = self.client.get(reverse('portfolio:projects'))
+        response_body(response)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(list(self.output_dir.iterdir()), [])
+
+    def test_bad_token_is_ignored(self):
+        response = self.client.get(reverse('portfolio:projects'), HTTP_X_PROFILE_TOKEN='profile:forged:token')
+        response_body(response)
+        self.assertNotIn('X-Profile-Id', response)
+
+    def test_signed_request_writes_profile_covering_the_render(self):
+        response = self.client.get(reverse('portfolio:projects'), HTTP_X_PROFILE_TOKEN=make_profile_token())
+        response_body(response)
+
+        profile_path = self.output_dir / f"{response['X-Profile-Id']}.prof"
+        self.assertTrue(profile_path.exists())
+        # the streamed template render happens after the view returns and should still be in there
+        functions = {func[2] for func in pstats.Stats(str(profile_path)).stats}
+        self.assertIn('iter_template', functions)
+
+
+class ProjectPagingTests(TestCase):
+    def test_cursors_walk_every_project_once_in_order(self):
+        seen, cursor = [], None
+        while True:
+            page, cursor = data.get_projects_page(after=cursor, limit=2)
+            seen.extend(p.slug for p in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [p.slug for p in data.get_all_projects()])
+
+    def test_fragment_rejects_bad_cursor(self):
+        response = self.client.get(reverse('portfolio:project_cards'), {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ProjectDetailTests(TestCase):
+    def test_detail_page_revalidates_with_its_etag(self):
+        url = reverse('portfolio:project_detail', args=['litigation'])
+        response = self.client.get(url)
+        self.assertContains(response, 'Litigation Intelligence Platform')
+        self.assertTrue(response.has_header('ETag'))
+
+        revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        other = self.client.get(reverse('portfolio:project_detail', args=['cluedo']))
+        self.assertNotEqual(other['ETag'], response['ETag'])
+
+    def test_unknown_slug_is_404(self):
+        self.assertEqual(self.client.get(reverse('portfolio:project_detail', args=['nope'])).status_code, 404)
+
+    def test_every_project_is_in_the_sitemap(self):
+        sitemap = self.client.get(reverse('portfolio:sitemap')).content.decode()
+        for project in data.get_all_projects():
+            self.assertIn(reverse('portfolio:project_detail', args=[project.slug]), sitemap)
+
+
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        db_path = Path(tempfile.mkdtemp()) / 'analytics.sqlite3'
+        self.settings_override = override_settings(ANALYTICS={**settings.ANALYTICS, 'DB_PATH': str(db_path)})
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        analytics.flush()
+
+    def test_beacon_only_buffers_until_flushed(self):
+        self.client.post(reverse('portfolio:analytics_beacon'), data=json.dumps({'kind': 'pageview', 'name': '/about/'}),
+                         content_type='text/plain')
+        with analytics.connect() as conn:
+            self.assertEqual(conn.execute('SELECT count(*) FROM events').fetchone()[0], 0)
+
+        self.assertEqual(analytics.flush(), 1)
+        with analytics.connect() as conn:
+            self.assertEqual(conn.execute('SELECT kind, name FROM events').fetchall(), [('pageview', '/about/')])
+
+    def test_beacon_rejects_unknown_events(self):
+        project = data.get_all_projects()[0]
+        for event, status in (
+            ({'kind': 'click', 'name': 'x'}, 400),
+            ({'kind': 'pageview', 'name': '/wp-admin/'}, 400),
+            ({'kind': 'pageview', 'name': '/projects/no-such-project/'}, 400),
+            ({'kind': 'download', 'name': 'anything'}, 400),
+            ({'kind': 'pageview', 'name': reverse('portfolio:project_detail', args=[project.slug])}, 204),
+            ({'kind': 'download', 'name': 'msc-dissertation'}, 204),
+        ):
+            with self.subTest(event=event):
+                response = self.client.post(reverse('portfolio:analytics_beacon'), data=json.dumps(event),
+                                            content_type='text/plain')
+                self.assertEqual(response.status_code, status)
+        self.assertEqual(analytics.flush(), 2)
+
+    def test_connections_are_closed(self):
+        with analytics.connect() as conn:
+            conn.execute('SELECT count(*) FROM events')
+        with self.assertRaises(analytics.sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
+
+    def test_rollup_counts_per_day(self):
+        for name in ('/', '/', '/projects/'):
+            analytics.record('pageview', name)
+        analytics.record('download', 'cv')
+        call_command('analytics_rollup', stdout=StringIO())
+
+        with analytics.connect() as conn:
+            counts = {(kind, name): count for kind, name, count in conn.execute('SELECT kind, name, count FROM daily_counts')}
+        self.assertEqual(counts, {('pageview', '/'): 2, ('pageview', '/projects/'): 1, ('download', 'cv'): 1})
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ServiceWorkerTests(TestCase):
+    def test_precaches_every_page_and_is_never_cached_by_the_browser(self):
+        response = self.client.get(reverse('portfolio:service_worker'))
+        script = response.content.decode()
+        self.assertEqual(response['Content-Type'], 'application/javascript')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        for name in service_worker.PRECACHE_PAGES:
+            self.assertIn(f'"{reverse(name)}"', script)
+        self.assertIn(f"const VERSION = '{service_worker.precache_manifest()[0]}';", script)
+        # clicking a dissertation shouldn't put megabytes into Cache Storage
+        self.assertIn(f'"{settings.STATIC_URL}css/"', script)
+        self.assertNotIn('documents/', script)
+
+    def test_menu_pages_are_precached_and_form_pages_are_network_first(self):
+        # main.js prefetches every menu link through the worker, which only keeps precached pages
+        menu = re.findall(r'<a href="([^"]+)" class="menu-link"', response_body(self.client.get(reverse('portfolio:home'))).decode())
+        self.assertTrue(menu)
+        self.assertLessEqual(set(menu), {reverse(name) for name in service_worker.PRECACHE_PAGES})
+
+        script = self.client.get(reverse('portfolio:service_worker')).content.decode()
+        self.assertIn(f'const NETWORK_FIRST_URLS = ["{reverse("portfolio:home")}"];', script)
+
+
+class IncrementalCollectStaticTests(TestCase):
+    def setUp(self):
+        self.source = Path(tempfile.mkdtemp())
+        (self.source / 'css').mkdir()
+        (self.source / 'css' / 'site.css').write_text('body { color: red; }\n' * 200)
+        (self.source / 'js').mkdir()
+        (self.source / 'js' / 'site.js').write_text('console.log("hello");\n' * 200)
+        storages = {**TEST_STORAGES, 'staticfiles': {'BACKEND': 'portfolio.storage.IncrementalCompressedStaticFilesStorage'}}
+        self.settings_override = override_settings(
+            STATICFILES_DIRS=[self.source], STATIC_ROOT=tempfile.mkdtemp(), STORAGES=storages,
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def collect(self):
+        output = StringIO()
+        call_command('collectstatic', interactive=False, stdout=output)
+        return output.getvalue()
+
+    def test_rebuild_only_compresses_changed_content(self):
+        # originals and hashed copies share content, so one compression each
+        self.assertIn('Compressed 2 new files, reused 0', self.collect())
+        self.assertIn('Compressed 0 new files, reused 4', self.collect())
+
+        (self.source / 'css' / 'site.css').write_text('body { color: blue; }\n' * 200)
+        self.assertIn('Compressed 1 new files, reused 2', self.collect())
+
+
+class TemplateMinifierTests(TestCase):
+    def test_collapses_markup_but_not_whitespace_sensitive_parts(self):
+        source = (
+            '<div>\n    <!-- note -->\n    <p>Hi   there</p>\n\n'
+            '<pre>  keep\n    this</pre>\n<textarea>\n  typed\n</textarea>\n'
+            '<script>\n  const a = 1;  // note\n</script>\n'
+            '{{ value|default:"two  spaces" }}\n<!-- {% if x %} -->\n</div>\n'
+        )
+        self.assertEqual(minify_html(source), (
+            '<div>\n<p>Hi there</p>\n'
+            '<pre>  keep\n    this</pre>\n<textarea>\n  typed\n</textarea>\n'
+            '<script>\n  const a = 1;  // note\n</script>\n'
+            '{{ value|default:"two  spaces" }}\n<!-- {% if x %} -->\n</div>\n'
+        ))
+
+
+class ArticleCompileTests(TestCase):
+    def setUp(self):
+        self.source_dir = Path(tempfile.mkdtemp())
+        (self.source_dir / 'post.md').write_text('## Heading\n\n```python\nprint("hi")\n```\n')
+        self.settings_override = override_settings(ARTICLES={'SOURCE_DIR': self.source_dir, 'CACHE_DIR': tempfile.mkdtemp()})
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def forget_in_memory(self):
+        # what a fresh worker looks like - only the disk cache is left
+        articles._compiled.clear()
+        articles._source_hashes.clear()
+
+    def test_compiles_once_per_source_change(self):
+        with mock.patch.object(articles, 'render_markdown', wraps=articles.render_markdown) as render:
+            compiled = articles.compile_article('post')
+            articles.compile_article('post')
+            self.forget_in_memory()
+            articles.compile_article('post')
+            self.assertEqual(render.call_count, 1)
+
+            (self.source_dir / 'post.md').write_text('## Changed heading\n')
+            self.assertIn('changed-heading', articles.compile_article('post')['toc'])
+            self.assertEqual(render.call_count, 2)
+
+        self.assertIn('class="highlight"', compiled['html'])
+        self.assertIn('href="#heading"', compiled['toc'])
+
+    def test_concurrent_cold_compiles_all_succeed(self):
+        self.forget_in_memory()
+        threads = 8
+        start = threading.Barrier(threads)
+        render = articles.render_markdown
+
+        def slow_render(source):
+            time.sleep(0.05)
+            return render(source)
+
+        def compile_together(index):
+            start.wait()
+            # staggered so most arrive while the first is still compiling
+            time.sleep(index * 0.01)
+            return articles.compile_article('post')['html']
+
+        with mock.patch.object(articles, 'render_markdown', slow_render), \
+                ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(compile_together, range(threads)))
+        self.assertEqual(len(set(results)), 1)
+
+
+def write_docx(path, paragraphs):
+    """a minimal .docx - paragraphs are (text, bold) pairs"""
+    body = ''.join(
+        f'<w:p><w:r>{"<w:rPr><w:b/></w:rPr>" if bold else ""}<w:t>{text}</w:t></w:r></w:p>'
+        for text, bold in paragraphs
+    )
+    with zipfile.ZipFile(path, 'w') as docx:
+        docx.writestr('word/document.xml', (
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f'<w:body>{body}</w:body></w:document>'
+        ))
+
+
+class DocumentPreviewTests(TestCase):
+    def setUp(self):
+        self.source_dir = Path(tempfile.mkdtemp())
+        self.path = self.source_dir / documents.DISSERTATION_FILES['msc']
+        self.abstract = 'A study of caching. ' * 10
+        write_docx(self.path, [
+            ('Caching Dissertation', False),
+            ('Abstract', True),
+            (self.abstract, False),
+            ('Method', True),
+            ('We measured things.', False),
+        ])
+        previews = {**settings.DOCUMENT_PREVIEWS, 'SOURCE_DIR': self.source_dir, 'CACHE_DIR': tempfile.mkdtemp()}
+        self.settings_override = override_settings(DOCUMENT_PREVIEWS=previews)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.addCleanup(self.forget_in_memory)
+
+    def forget_in_memory(self):
+        documents._previews.clear()
+        documents._source_hashes.clear()
+
+    def test_extracts_once_per_file_change(self):
+        with mock.patch.object(documents, 'extract_preview', wraps=documents.extract_preview) as extract:
+            preview = documents.get_preview('msc')
+            documents.get_preview('msc')
+            self.forget_in_memory()
+            documents.get_preview('msc')
+            self.assertEqual(extract.call_count, 1)
+
+            write_docx(self.path, [('Second Edition', False), ('More words here.', False)])
+            self.assertEqual(documents.get_preview('msc')['title'], 'Second Edition')
+            self.assertEqual(extract.call_count, 2)
+
+        self.assertEqual(preview['title'], 'Caching Dissertation')
+        self.assertEqual(preview['abstract'], self.abstract.strip())
+        self.assertEqual(preview['headings'], ['Abstract', 'Method'])
+        # the abstract is shown on its own, so the excerpt carries on after it
+        self.assertEqual(preview['excerpt'][0]['text'], 'Method')
+        self.assertIn('<svg', preview['thumbnail'])
+
+    def test_missing_or_broken_files_have_no_preview(self):
+        with self.assertLogs('portfolio.documents', 'WARNING'):
+            self.assertIsNone(documents.get_preview('bsc'))
+        self.path.write_bytes(b'not a zip')
+        with self.assertLogs('portfolio.documents', 'ERROR'):
+            self.assertIsNone(documents.get_preview('msc'))
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class CVTests(TestCase):
+    def setUp(self):
+        settings_override = override_settings(CV={**settings.CV, 'OUTPUT_DIR': Path(tempfile.mkdtemp())})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cv.cv_version.cache_clear()
+        self.addCleanup(cv.cv_version.cache_clear)
+
+    def test_rendered_once_per_content_change(self):
+        with mock.patch.object(cv, 'render_pdf', wraps=cv.render_pdf) as render:
+            paths = cv.build_cv()
+            cv.build_cv()
+            self.assertEqual(render.call_count, 1)
+
+            cv.cv_version.cache_clear()
+            versions = {**data.current_section_versions(), 'experience': 'edited'}
+            with mock.patch.object(data, 'current_section_versions', return_value=versions):
+                self.assertNotEqual(cv.build_cv()['pdf'], paths['pdf'])
+            self.assertEqual(render.call_count, 2)
+
+        pdf = paths['pdf'].read_bytes()
+        self.assertTrue(pdf.startswith(b'%PDF-') and pdf.rstrip().endswith(b'%%EOF'))
+        self.assertIn(data.PERSONAL_INFO['name'], paths['html'].read_text(encoding='utf-8'))
+
+    def test_download_answers_range_requests(self):
+        url = reverse('portfolio:download_cv')
+        size = len(response_body(self.client.get(url)))
+
+        partial_response = self.client.get(url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(partial_response.status_code, 206)
+        self.assertEqual(partial_response['Content-Range'], f"bytes 100-199/{size}")
+        self.assertEqual(len(response_body(partial_response)), 100)
+        self.assertEqual(len(response_body(self.client.get(url, HTTP_RANGE='bytes=-50'))), 50)
+
+        # a resume against an older copy gets the whole new file
+        stale = self.client.get(url, HTTP_RANGE='bytes=100-', HTTP_IF_RANGE='"old"')
+        self.assertEqual(stale.status_code, 200)
+        response_body(stale)
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f"bytes={size}-").status_code, 416)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class LoadSheddingTests(TestCase):
+    def shedding(self, **options):
+        return override_settings(LOAD_SHEDDING={**settings.LOAD_SHEDDING, **options})
+
+    def test_expensive_routes_shed_without_touching_pages(self):
+        with self.shedding(EXPENSIVE_MAX_IN_FLIGHT=0):
+            response = self.client.post(reverse('portfolio:ajax_contact'), data='{}', content_type='application/json')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], str(settings.LOAD_SHEDDING['RETRY_AFTER']))
+            self.assertFalse(response.json()['success'])
+            self.assertEqual(self.client.get(reverse('portfolio:download_cv')).status_code, 503)
+            self.assertEqual(self.client.get(reverse('portfolio:home')).status_code, 200)
+
+    def test_slot_is_released_once_a_streamed_page_is_sent(self):
+        with self.shedding(MAX_IN_FLIGHT=1):
+            for _ in range(3):
+                response = self.client.get(reverse('portfolio:projects'))
+                self.assertEqual(response.status_code, 200)
+                response_body(response)
+
+    def test_pages_leave_threads_for_the_expensive_views(self):
+        # a limit at or over the thread count never sheds anything
+        options = settings.LOAD_SHEDDING
+        self.assertLessEqual(options['MAX_IN_FLIGHT'] + options['EXPENSIVE_MAX_IN_FLIGHT'], settings.GUNICORN_THREADS)
+
+    def test_shed_count_is_exact_across_threads(self):
+        budget = ConcurrencyBudget('pages', 0, 0)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: [budget.count_shed() for _ in range(1000)], range(8)))
+        self.assertEqual(budget.shed, 8000)
+
+    def test_requests_queued_too_long_are_shed(self):
+        url = reverse('portfolio:home')
+        with self.shedding(MAX_QUEUE_MS=1000):
+            stale = self.client.get(url, HTTP_X_REQUEST_START=f"t={int((time.time() - 5) * 1e6)}")
+            self.assertEqual(stale.status_code, 503)
+            self.assertIn('Retry-After', stale)
+            fresh = self.client.get(url, HTTP_X_REQUEST_START=f"t={int(time.time() * 1000)}")
+            self.assertEqual(fresh.status_code, 200)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class StreamingGZipTests(TestCase):
+    def test_head_is_sent_compressed_before_the_rest_renders(self):
+        middleware = ['portfolio.middleware.StreamingGZipMiddleware', *settings.MIDDLEWARE]
+        with override_settings(MIDDLEWARE=middleware):
+            response = self.client.get(reverse('portfolio:home'), HTTP_ACCEPT_ENCODING='gzip')
+        self.addCleanup(response.close)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+        chunks = iter(response.streaming_content)
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        # the first chunk off the wire decompresses to the whole head on its own
+        head = decompressor.decompress(next(chunks))
+        self.assertIn(b'</head>', head)
+        page = head + b''.join(decompressor.decompress(chunk) for chunk in chunks) + decompressor.flush()
+        self.assertTrue(page.rstrip().endswith(b'</html>'))
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class SingleFlightTests(TestCase):
+    THREADS = 8
+
+    def setUp(self):
+        cache.clear()
+
+    def run_together(self, func):
+        start = threading.Barrier(self.THREADS)
+
+        def job(_):
+            start.wait()
+            return func()
+
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            return list(pool.map(job, range(self.THREADS)))
+
+    def slow(self, func, calls):
+        def wrapper(*args, **kwargs):
+            calls.append(1)
+            time.sleep(0.1)
+            return func(*args, **kwargs)
+        return wrapper
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+        compute = self.slow(lambda: 'value', calls)
+        results = self.run_together(lambda: singleflight.get_or_compute('single-flight-test', compute))
+        self.assertEqual(results, ['value'] * self.THREADS)
+        self.assertEqual(len(calls), 1)
+
+    def test_concurrent_cold_page_requests_render_once(self):
+        calls = []
+        url = reverse('portfolio:about')
+        with mock.patch.object(views, 'render_page', self.slow(views.render_page, calls)):
+            bodies = self.run_together(lambda: response_body(Client().get(url)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(set(bodies)), 1)
+
+    def test_waiting_requests_dont_wait_for_the_leaders_download(self):
+        url = reverse('portfolio:about')
+        # the leader's visitor hasn't read any of the page yet
+        leader = Client().get(url)
+        started = time.monotonic()
+        follower = Client().get(url)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response_body(follower), response_body(leader))
+
+    def test_cold_cached_pages_still_flush_the_head_early(self):
+        url = reverse('portfolio:about')
+        leader = Client().get(url)
+        self.assertTrue(leader.streaming)
+        chunks = list(leader.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        self.assertIn(b'</head>', chunks[0])
+        # read to the end, so it's cached now
+        warm = Client().get(url)
+        self.assertEqual(response_body(warm), b''.join(chunks))
+
+    def test_slow_entries_refresh_early(self):
+        with mock.patch.object(singleflight.random, 'random', return_value=0.5):
+            singleflight.set_entry('early-refresh-test', 'old', delta=0.0, timeout=60)
+            self.assertEqual(singleflight.get_or_compute('early-refresh-test', lambda: 'new'), 'old')
+            # something that's very slow to compute compared to how long it's cached for gets rebuilt early
+            singleflight.set_entry('early-refresh-test', 'old', delta=100.0, timeout=60)
+            self.assertEqual(singleflight.get_or_compute('early-refresh-test', lambda: 'new'), 'new')
+
+    def test_failed_early_refresh_keeps_cached_copy(self):
+        def broken():
+            raise RuntimeError('render failed')
+
+        singleflight.set_entry('early-refresh-test', 'old', delta=100.0, timeout=60)
+        with mock.patch.object(singleflight.random, 'random', return_value=0.5), \
+                self.assertLogs('portfolio.singleflight', 'ERROR'):
+            self.assertEqual(singleflight.get_or_compute('early-refresh-test', broken), 'old')
+        with self.assertRaises(RuntimeError):
+            singleflight.get_or_compute('missing-test', broken)
+
+
+class OutboundHTTPTests(TestCase):
+    """the pooled client against a local StubServer"""
+
+    def setUp(self):
+        self.stub = StubServer().start()
+        self.addCleanup(self.stub.stop)
+        self.stub.add_route('GET', '/ok', json={'ok': True})
+        self.stub.add_route('GET', '/slow', delay=0.2)
+
+    def make_client(self, **options):
+        client = HTTPClient(**options)
+        self.addCleanup(client.close)
+        return client
+
+    def host_metrics(self, client):
+        return client.metrics()[f"http://{self.stub.host}:{self.stub.port}"]
+
+    def test_keeps_connections_alive_between_requests(self):
+        client = self.make_client()
+        for _ in range(3):
+            self.assertEqual(client.get(self.stub.url('/ok')).json(), {'ok': True})
+        self.assertEqual(self.stub.connections, 1)
+        self.assertEqual(self.host_metrics(client)['connections_reused'], 2)
+
+    def test_caps_connections_per_host(self):
+        client = self.make_client(max_connections_per_host=2)
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            statuses = list(pool.map(lambda _: client.get(self.stub.url('/slow')).status, range(6)))
+        self.assertEqual(statuses, [200] * 6)
+        self.assertEqual(self.stub.connections, 2)
+
+        impatient = self.make_client(max_connections_per_host=1, pool_wait=0.05)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [pool.submit(impatient.get, self.stub.url('/slow')) for _ in range(2)]
+        errors = [future.exception() for future in futures]
+        self.assertEqual(sum(isinstance(e, PoolTimeoutError) for e in errors), 1)
+
+    def test_retries_once_when_a_reused_connection_was_closed(self):
+        client = self.make_client()
+        client.get(self.stub.url('/ok'))
+        self.stub.drop_connections()
+        self.assertTrue(client.get(self.stub.url('/ok')).ok)
+        self.assertEqual(self.stub.connections, 2)
+        self.assertEqual(self.host_metrics(client)['errors'], 0)
+
+    def test_posts_are_not_retried_on_a_closed_connection(self):
+        self.stub.add_route('POST', '/send', json={'id': 1})
+        client = self.make_client()
+        client.get(self.stub.url('/ok'))
+        self.stub.drop_connections()
+        with self.assertRaises(OutboundHTTPError):
+            client.post(self.stub.url('/send'), json={})
+        self.assertEqual(self.stub.connections, 1)
+        self.assertEqual(self.host_metrics(client)['errors'], 1)
+
+    def test_circuit_opens_then_lets_one_trial_through(self):
+        client = self.make_client(failure_threshold=2, reset_timeout=0.2)
+        self.stub.add_route('GET', '/flaky', status=500)
+        url = self.stub.url('/flaky')
+        for _ in range(2):
+            self.assertEqual(client.get(url).status, 500)
+        with self.assertRaises(CircuitOpenError):
+            client.get(url)
+        self.assertEqual(len(self.stub.requests), 2)
+
+        time.sleep(0.25)
+        self.assertEqual(self.host_metrics(client)['circuit'], 'half-open')
+        # a failed trial opens it again straight away, no second run up to the threshold
+        self.assertEqual(client.get(url).status, 500)
+        self.assertEqual(self.host_metrics(client)['circuit'], 'open')
+
+        time.sleep(0.25)
+        self.stub.add_route('GET', '/flaky', status=200)
+        self.assertTrue(client.get(url).ok)
+        self.assertEqual(self.host_metrics(client)['circuit'], 'closed')
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class EdgeCacheTests(TestCase):
+    """surrogate keys on the pages and purge_edge_cache against a StubServer standing in for the CDN"""
+
+    def setUp(self):
+        cache.clear()
+        self.stub = StubServer().start()
+        self.addCleanup(self.stub.stop)
+        self.manifest = Path(tempfile.mkdtemp()) / 'content_versions.json'
+        # as if projects and skills were edited since the last purge
+        self.manifest.write_text(json.dumps({**data.get_section_versions(), 'projects': 'old', 'skills': 'old'}))
+
+    def edge_cache(self, **options):
+        return override_settings(EDGE_CACHE={**settings.EDGE_CACHE, 'PURGE_URL': self.stub.url('/purge'), **options})
+
+    def test_pages_are_tagged_with_their_sections(self):
+        with self.edge_cache(TTL=300):
+            response = self.client.get(reverse('portfolio:about'))
+            response_body(response)
+        self.assertEqual(response['Surrogate-Key'], 'personal_info site_settings experience skills')
+        self.assertEqual(response['Cache-Tag'], 'personal_info,site_settings,experience,skills')
+        self.assertIn('s-maxage=300', response['Cache-Control'])
+
+    def test_pages_with_a_csrf_token_never_go_to_the_edge(self):
+        with self.edge_cache(TTL=300):
+            # a first visit, then one that already has the CSRF cookie
+            for _ in range(2):
+                response = self.client.get(reverse('portfolio:home'))
+                response_body(response)
+                self.assertIn('csrftoken', response.cookies)
+                self.assertNotIn('public', response.get('Cache-Control', ''))
+                self.assertNotIn('s-maxage', response.get('Cache-Control', ''))
+
+    def test_purges_only_the_changed_sections(self):
+        self.stub.add_route('POST', '/purge', json={'success': True})
+        with self.edge_cache(PURGE_TOKEN='secret', PURGE_FORMAT='surrogate_keys'):
+            call_command('purge_edge_cache', manifest=str(self.manifest), stdout=StringIO())
+            # the new versions were saved, so running it again has nothing to do
+            call_command('purge_edge_cache', manifest=str(self.manifest), stdout=StringIO())
+
+        [purge] = self.stub.requests
+        self.assertEqual(purge.json(), {'surrogate_keys': ['projects', 'skills']})
+        self.assertEqual(purge.headers['Authorization'], 'Bearer secret')
+        self.assertEqual(json.loads(self.manifest.read_text()), data.get_section_versions())
+
+    def test_rejected_purge_keeps_the_old_versions(self):
+        self.stub.add_route('POST', '/purge', status=403, json={'success': False})
+        before = self.manifest.read_text()
+        with self.edge_cache(), self.assertRaisesMessage(CommandError, 'HTTP 403'):
+            call_command('purge_edge_cache', manifest=str(self.manifest), stdout=StringIO())
+        self.assertEqual(self.stub.requests[0].json(), {'tags': ['projects', 'skills']})
+        # so the next run tries the same sections again
+        self.assertEqual(self.manifest.read_text(), before)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ConcurrencyTests(TestCase):
+    """every view hammered from many threads at once, the way gthread workers serve them"""
+
+    THREADS = 16
+    ROUNDS = 8
+
+    def setUp(self):
+        analytics_db = str(Path(tempfile.mkdtemp()) / 'analytics.sqlite3')
+        self.articles_cache = Path(tempfile.mkdtemp())
+        # shedding would turn some of the contact posts into 503s, which isn't what's being tested here
+        self.settings_override = override_settings(
+            ANALYTICS={**settings.ANALYTICS, 'DB_PATH': analytics_db},
+            ARTICLES={**settings.ARTICLES, 'CACHE_DIR': self.articles_cache},
+            LOAD_SHEDDING={**settings.LOAD_SHEDDING, 'ENABLED': False},
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def fetch(self, client, name, budget):
+        url = reverse(name, kwargs=budget.get('kwargs'))
+        if budget.get('method') == 'post':
+            response = client.post(url, data=json.dumps(budget.get('json', {})), content_type='application/json')
+        else:
+            response = client.get(url)
+        # the CSRF token is different every time, everything else should match exactly
+        body = re.sub(rb'name="csrfmiddlewaretoken" value="[^"]*"', b'', response_body(response))
+        return response.status_code, body
+
+    def test_threaded_responses_match_single_threaded(self):
+        views = list(BUDGETS['views'].items())
+        expected = {name: self.fetch(self.client, name, budget) for name, budget in views}
+
+        local = threading.local()
+
+        def worker(job):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            index, (name, budget) = job
+            # empty the caches now and then so renders and cache fills race each other too -
+            # the in-process ones as well, like a worker that's just started
+            if index % 25 == 0:
+                cache.clear()
+                articles._source_hashes.clear()
+                articles._compiled.clear()
+                shutil.rmtree(self.articles_cache, ignore_errors=True)
+            return name, self.fetch(local.client, name, budget)
+
+        jobs = list(enumerate(views * self.ROUNDS))
+        with self.assertNoLogs('portfolio.caching', 'WARNING'):
+            with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+                results = list(pool.map(worker, jobs))
+
+        for name, result in results:
+            self.assertEqual(result, expected[name], f"{name} gave a different response under concurrency")
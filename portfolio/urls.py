@@ -9,10 +9,25 @@ urlpatterns = [
     # About Me is a separate detailed page
     path('about/', views.about_view, name='about'),
     path('projects/', views.projects_view, name='projects'),
+    # next batch of project cards for infinite scroll
+    path('projects/cards/', views.project_cards_view, name='project_cards'),
+    path('projects/<slug:slug>/', views.project_detail_view, name='project_detail'),
     path('education/', views.education_view, name='education'),
+    # markdown articles, see articles.py
+    path('writing/', views.articles_view, name='articles'),
+    path('writing/feed/', views.articles_feed_view, name='articles_feed'),
+    path('writing/<slug:slug>/', views.article_detail_view, name='article_detail'),
     path('download/msc-dissertation/', views.download_msc_dissertation, name='download_msc'),
     path('download/bsc-dissertation/', views.download_bsc_dissertation, name='download_bsc'),
+    # CV generated from data.py, see cv.py
+    path('cv/', views.cv_view, name='cv'),
+    path('download/cv/', views.download_cv, name='download_cv'),
     path('ajax/contact/', views.ajax_contact_view, name='ajax_contact'),
+    path('sitemap.xml', views.sitemap_view, name='sitemap'),
+    # service worker has to live at the root to control every page
+    path('sw.js', views.service_worker_view, name='service_worker'),
+    # page view / download beacon, see analytics.py
+    path('analytics/beacon/', views.analytics_beacon_view, name='analytics_beacon'),
 ]
 
 
@@ -3,16 +3,23 @@ Portfolio Views
 All the view functions for rendering pages and handling requests
 """
 
-from django.shortcuts import render
+from django.contrib.sitemaps.views import sitemap
 from django.http import JsonResponse, HttpResponse, FileResponse, Http404
-from django.views.decorators.http import require_http_methods
-from django.core.mail import send_mail, BadHeaderError
+from django.template.loader import get_template, render_to_string
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_http_methods
 from django.conf import settings
-from pathlib import Path
+from functools import lru_cache
+from urllib.parse import urlsplit
 import json
 import logging
-import resend
-from . import data
+from . import analytics, articles, cv, data, documents, service_worker
+from .caching import SITE_SECTIONS, tag_sections, cached_content
+from .downloads import is_full_download, ranged_file_response
+from .feeds import LatestArticlesFeed
+from .sitemaps import SITEMAPS
+from .services.email import send_contact_email
+from .streaming import render_page
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +33,10 @@ def get_site_context():
 
 
 # Page Views
+# each page declares the data.py sections it uses - see caching.py
 
+# not page cached - the contact form's CSRF token is per visitor
+@tag_sections('experience')
 def home_view(request):
     """home page with hero section"""
     context = get_site_context()
@@ -36,9 +46,10 @@ def home_view(request):
         'page_class': 'home-page',
         'meta_description': 'Jem Andrew - Machine Learning Engineer specialising in software development, ML, and data analysis.',
     })
-    return render(request, 'portfolio/home.html', context)
+    return render_page(request, 'portfolio/home.html', context)
 
 
+@tag_sections('experience', 'skills', cache_page=True)
 def about_view(request):
     """about page showing career path and skills"""
     context = get_site_context()
@@ -49,29 +60,152 @@ def about_view(request):
         'page_title': 'About Me - Jem Andrew',
         'meta_description': 'Learn more about Jem Andrew - software engineer passionate about backend development, AI, and clean code.',
     })
-    return render(request, 'portfolio/about.html', context)
+    return render_page(request, 'portfolio/about.html', context)
 
 
+@tag_sections('projects', cache_page=True)
 def projects_view(request):
-    """projects page showing all work"""
+    """projects page - first page of cards, the rest load in as you scroll"""
+    projects, next_cursor = data.get_projects_page(limit=settings.PROJECTS_PAGE_SIZE)
     context = get_site_context()
     context.update({
-        'projects': data.get_all_projects(),
+        'project_cards': [render_project_card(p) for p in projects],
+        'next_cursor': next_cursor,
         'page_title': 'Projects - Jem Andrew',
         'meta_description': 'Portfolio of projects by Jem Andrew - software development, machine learning, and data analysis.',
     })
-    return render(request, 'portfolio/projects.html', context)
+    return render_page(request, 'portfolio/projects.html', context)
 
 
+@tag_sections('projects', site_wide=False)
+def project_cards_view(request):
+    """HTML fragment with the next batch of project cards, cursor for the batch after goes in X-Next-Cursor"""
+    try:
+        projects, next_cursor = data.get_projects_page(
+            after=request.GET.get('after'),
+            limit=settings.PROJECTS_PAGE_SIZE,
+        )
+    except ValueError:
+        return HttpResponse("Invalid cursor.", status=400)
+
+    response = HttpResponse(''.join(render_project_card(p) for p in projects))
+    response['X-Next-Cursor'] = next_cursor or ''
+    return response
+
+
+def render_project_card(project):
+    """renders one card, cached on its own so editing one project only re-renders that card"""
+    return cached_content(
+        f"project-card:{project.slug}",
+        ['projects'],
+        lambda: render_to_string('portfolio/partials/project_card.html', {'project': project}),
+        version=data.hash_content(vars(project)),
+    )
+
+
+@lru_cache(maxsize=1)
+def project_page_release():
+    """hash of what every project page shares apart from content - its templates and the static asset urls"""
+    templates = [get_template(name).template.source for name in ('portfolio/base.html', 'portfolio/project_detail.html')]
+    return data.hash_content([templates, service_worker.manifest_assets()])
+
+
+def project_page_version(project):
+    """changes when this project, the site-wide content or a deploy changes it - editing another project doesn't"""
+    versions = data.current_section_versions()
+    return data.hash_content([vars(project), [versions.get(s) for s in SITE_SECTIONS], project_page_release()])
+
+
+def project_etag(request, slug):
+    project = data.get_project(slug)
+    return project_page_version(project) if project else None
+
+
+# not cache_page - that keys on the view name, these are cached one project at a time instead
+@tag_sections('projects')
+@condition(etag_func=project_etag)
+def project_detail_view(request, slug):
+    """one project on its own page, for deep links and crawlers - answers If-None-Match with a 304"""
+    project = data.get_project(slug)
+    if project is None:
+        raise Http404("Project not found")
+
+    def render():
+        context = get_site_context()
+        context.update({
+            'project': project,
+            'page_title': f"{project.title} - Jem Andrew",
+            'meta_description': project.short_description,
+        })
+        return render_to_string('portfolio/project_detail.html', context, request=request)
+
+    html = cached_content('project-page', [*SITE_SECTIONS, 'projects'], render, version=project_page_version(project))
+    return HttpResponse(html)
+
+
+@tag_sections('education', cache_page=True)
 def education_view(request):
     """education page with degrees and dissertations"""
     context = get_site_context()
     context.update({
         'education_list': data.get_all_education(),
+        # built at deploy time, so this is a dict lookup - see documents.py
+        'dissertation_previews': documents.get_previews(documents.DISSERTATION_FILES),
         'page_title': 'Education - Jem Andrew',
         'meta_description': 'Educational background of Jem Andrew - Computer Science, AI, and Software Engineering.',
     })
-    return render(request, 'portfolio/education.html', context)
+    return render_page(request, 'portfolio/education.html', context)
+
+
+# Writing
+
+@tag_sections('articles', cache_page=True)
+def articles_view(request):
+    """list of articles - only the index from data.py, no markdown gets compiled here"""
+    context = get_site_context()
+    context.update({
+        'articles': data.get_all_articles(),
+        'page_title': 'Writing - Jem Andrew',
+        'meta_description': 'Notes and articles by Jem Andrew on Django, performance and machine learning.',
+    })
+    return render_page(request, 'portfolio/articles.html', context)
+
+
+@tag_sections('articles')
+def article_detail_view(request, slug):
+    """one article - the compiled HTML comes from articles.py and is only rebuilt when the markdown changes"""
+    article = data.get_article(slug)
+    if article is None:
+        raise Http404("Article not found")
+    
+    try:
+        compiled = articles.compile_article(slug)
+    except FileNotFoundError:
+        logger.error(f"Markdown missing for article: {slug}")
+        raise Http404("Article not available")
+    
+    context = get_site_context()
+    context.update({
+        'article': article,
+        'article_html': compiled['html'],
+        'article_toc': compiled['toc'],
+        'page_title': f"{article.title} - Jem Andrew",
+        'meta_description': article.summary,
+    })
+    return render_page(request, 'portfolio/article_detail.html', context)
+
+
+@tag_sections('articles', site_wide=False, cache_page=True)
+def articles_feed_view(request):
+    """RSS feed of the latest articles"""
+    return LatestArticlesFeed()(request)
+
+
+@tag_sections('projects', 'articles', site_wide=False, cache_page=True)
+def sitemap_view(request):
+    """sitemap.xml with the main pages, every project and every article"""
+    # rendered here so the page cache gets the finished XML rather than a TemplateResponse
+    return sitemap(request, sitemaps=SITEMAPS).render()
 
 
 # File Downloads
@@ -79,17 +213,13 @@ def education_view(request):
 def serve_dissertation_file(request, degree_type):
     """handles downloading dissertation DOCX files for both MSc and BSc"""
     # map degree type to actual filename in static/documents
-    file_mapping = {
-        'msc': 'MSc_Jem_Andrew_Dissertation.docx',
-        'bsc': 'BSc_Jem_Andrew_Dissertation.docx',
-    }
-    
-    if degree_type not in file_mapping:
+    # documents.py has the degree -> file mapping, the previews are built from the same files
+    if degree_type not in documents.DISSERTATION_FILES:
         raise Http404("Invalid dissertation type")
     
-    filename = file_mapping[degree_type]
+    filename = f"{degree_type.upper()}_Jem_Andrew_Dissertation.docx"
     # dissertations are in static/documents not media
-    file_path = Path(settings.BASE_DIR) / 'static' / 'documents' / filename
+    file_path = documents.source_path(degree_type)
     
     # check if file actually exists
     if not file_path.exists():
@@ -97,12 +227,16 @@ def serve_dissertation_file(request, degree_type):
         raise Http404("Dissertation file not available")
     
     try:
-        return FileResponse(
-            open(file_path, 'rb'),
-            as_attachment=True,
-            filename=filename,
-            content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+        # range-capable so a dropped download of the 2 MB BSc file resumes instead of restarting
+        response = ranged_file_response(
+            request,
+            file_path,
+            filename,
+            'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
         )
+        if is_full_download(response):
+            analytics.record('download', f"{degree_type}-dissertation")
+        return response
     except IOError as e:
         logger.error(f"Error reading {degree_type.upper()} dissertation: {e}")
         return HttpResponse("Sorry, the file is temporarily unavailable.", status=500)
@@ -118,24 +252,27 @@ def download_bsc_dissertation(request):
     return serve_dissertation_file(request, 'bsc')
 
 
+@tag_sections(*cv.CV_SECTIONS, site_wide=False)
 def download_cv(request):
-    """serves the CV PDF file"""
-    cv_path = Path(settings.MEDIA_ROOT) / 'cv' / 'Jem_Andrew_CV.pdf'
-    
-    if not cv_path.exists():
-        logger.warning(f"CV not found: {cv_path}")
-        raise Http404("CV not available")
-    
+    """serves the CV PDF, generated from data.py the first time it's asked for after a content change"""
     try:
-        return FileResponse(
-            open(cv_path, 'rb'),
-            as_attachment=True,
-            filename='Jem_Andrew_CV.pdf',
-            content_type='application/pdf'
-        )
-    except IOError as e:
-        logger.error(f"Error reading CV: {e}")
+        response = ranged_file_response(request, cv.build_cv()['pdf'], 'Jem_Andrew_CV.pdf', 'application/pdf')
+    except OSError as e:
+        logger.error(f"Error building or reading CV: {e}")
         return HttpResponse("Sorry, the file is temporarily unavailable.", status=500)
+    if is_full_download(response):
+        analytics.record('download', 'cv')
+    return response
+
+
+@tag_sections(*cv.CV_SECTIONS, site_wide=False)
+def cv_view(request):
+    """the same CV as a standalone page - quick to skim on a phone and prints cleanly"""
+    try:
+        return FileResponse(open(cv.build_cv()['html'], 'rb'), content_type='text/html; charset=utf-8')
+    except OSError as e:
+        logger.error(f"Error building or reading CV: {e}")
+        return HttpResponse("Sorry, the CV is temporarily unavailable.", status=500)
 
 
 # Contact Form
@@ -161,20 +298,12 @@ def ajax_contact_view(request):
         
         logger.info(f"Contact form - Name: {name}, Email: {email}, Subject: {subject}")
         
-        # Send email via Resend
-        if settings.RESEND_API_KEY:
-            try:
-                resend.api_key = settings.RESEND_API_KEY
-                
-                resend.Emails.send({
-                    "from": "Portfolio Contact <onboarding@resend.dev>",
-                    "to": "andrewjem8@gmail.com",
-                    "subject": f"Portfolio Contact: {subject}",
-                    "text": f"From: {name}\nEmail: {email}\n\n{message}"
-                })
+        # Send email via Resend (pooled connection, see services/email.py)
+        try:
+            if send_contact_email(name, email, subject, message):
                 logger.info("Email sent via Resend")
-            except Exception as e:
-                logger.error(f"Resend failed: {e}")
+        except Exception as e:
+            logger.error(f"Resend failed: {e}")
         
         return JsonResponse({
             'success': True,
@@ -188,6 +317,54 @@ def ajax_contact_view(request):
         return JsonResponse({'success': False, 'message': 'Something went wrong.'}, status=500)
 
 
+# Service Worker
+
+def service_worker_view(request):
+    """serves the service worker from the site root so its scope covers every page"""
+    version, pages, assets = service_worker.precache_manifest()
+    script = render_to_string('portfolio/service_worker.js', {
+        'version': version,
+        'page_urls': json.dumps(pages),
+        'asset_urls': json.dumps(assets),
+        'network_first_urls': json.dumps(service_worker.network_first_urls()),
+        'static_dirs': json.dumps([settings.STATIC_URL + d for d in service_worker.PRECACHE_DIRS]),
+    })
+    response = HttpResponse(script, content_type='application/javascript')
+    # browsers cap this at a day anyway, no-cache means a deploy is picked up on the next visit
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+# Analytics
+
+# sendBeacon can't add a CSRF header, and the worst a forged beacon can do is bump a counter
+@csrf_exempt
+@require_http_methods(["POST"])
+def analytics_beacon_view(request):
+    """page view and download beacon from main.js - only queues the event, see analytics.py"""
+    try:
+        event = json.loads(request.body)
+    except json.JSONDecodeError:
+        return HttpResponse(status=400)
+    
+    if not isinstance(event, dict):
+        return HttpResponse(status=400)
+    
+    kind = event.get('kind')
+    name = event.get('name')
+    if not isinstance(name, str) or not analytics.is_known(kind, name):
+        return HttpResponse(status=400)
+    
+    # only keep the referring site, and skip it for clicks around this one
+    referrer = event.get('referrer')
+    referrer = urlsplit(referrer).netloc if isinstance(referrer, str) else ''
+    if referrer == request.get_host():
+        referrer = ''
+    
+    analytics.record(kind, name, referrer)
+    return HttpResponse(status=204)
+
+
 def validate_contact_form(name, email, subject, message):
     """validates contact form fields and returns dict of errors"""
     errors = {}
@@ -228,8 +405,14 @@ def validate_contact_form(name, email, subject, message):
 
 
 # API endpoint for skills data if i need it later for charts
+@tag_sections('skills', site_wide=False)
 def api_skills_view(request):
     """returns skills data as JSON"""
+    return JsonResponse({'skills': cached_content('api:skills', ['skills'], build_skills_payload)})
+
+
+def build_skills_payload():
+    """flattens skills into one list for the JSON API"""
     skills_by_category = data.get_skills_by_category()
     
     skills_data = []
@@ -242,4 +425,4 @@ def api_skills_view(request):
                 'experience': skill.years_experience,
             })
     
-    return JsonResponse({'skills': skills_data})
\ No newline at end of file
+    return skills_data
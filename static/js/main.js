@@ -10,6 +10,10 @@ class ModernPortfolio {
     }
 
     async init() {
+        // Count the page view straight away, it doesn't need to wait for the loading screen
+        this.setupAnalytics();
+        this.registerServiceWorker();
+        
         // Need to handle loading screen first before anything else renders
         await this.handleLoadingScreen();
         
@@ -19,6 +23,7 @@ class ModernPortfolio {
         // Set up core functionality
         this.setupThemeToggle();
         this.setupFullscreenMenu();
+        this.setupMenuPrefetch();
         this.setupSmoothScroll();
         this.setupAnimations();
         this.setupScrollReveal();
@@ -36,6 +41,40 @@ class ModernPortfolio {
         }
     }
     
+    // Self-hosted analytics - a page view beacon plus one per download link click
+    setupAnalytics() {
+        const beaconUrl = document.body.dataset.beaconUrl;
+        if (!beaconUrl || !navigator.sendBeacon) return;
+        
+        const send = (kind, name) => {
+            navigator.sendBeacon(beaconUrl, JSON.stringify({
+                kind,
+                name,
+                referrer: document.referrer
+            }));
+        };
+        
+        send('pageview', window.location.pathname);
+        
+        // sendBeacon still goes out when the click navigates away from the page
+        document.querySelectorAll('[data-download]').forEach(link => {
+            link.addEventListener('click', () => send('download', link.dataset.download));
+        });
+    }
+    
+    // Service worker keeps the main pages and static files cached for instant and offline visits
+    registerServiceWorker() {
+        const serviceWorkerUrl = document.body.dataset.serviceWorkerUrl;
+        if (!serviceWorkerUrl || !('serviceWorker' in navigator)) return;
+        
+        // Registering after load keeps the precache downloads from competing with the page
+        this.waitForPageLoad().then(() => {
+            navigator.serviceWorker.register(serviceWorkerUrl).catch(error => {
+                console.error('Service worker registration failed:', error);
+            });
+        });
+    }
+    
     // Loading screen handler
     async handleLoadingScreen() {
         const loadingScreen = document.getElementById('loadingScreen');
@@ -236,15 +275,16 @@ class ModernPortfolio {
     
     // Projects page setup
     setupProjectsPage() {
+        this.activeProjectFilter = 'all';
         this.setupProjectFiltering();
         this.setupProjectNavigation();
         this.setupExpandableProjects();
+        this.setupProjectsLoadMore();
     }
     
     // Project filtering by category
     setupProjectFiltering() {
         const filterButtons = document.querySelectorAll('.projects-nav-link');
-        const projectCards = document.querySelectorAll('.project-card');
         const projectCount = document.getElementById('projectCount');
         
         if (!filterButtons.length) return;
@@ -252,23 +292,22 @@ class ModernPortfolio {
         filterButtons.forEach(button => {
             button.addEventListener('click', () => {
                 const filter = button.dataset.filter;
+                this.activeProjectFilter = filter;
                 
                 // Update active button state
                 filterButtons.forEach(btn => btn.classList.remove('active'));
                 button.classList.add('active');
                 
+                // Cards can be added later by infinite scroll, so look them up each time
+                const projectCards = document.querySelectorAll('.project-card');
+                
                 // Show/hide projects based on filter
                 let visibleCount = 0;
                 projectCards.forEach(card => {
-                    const category = card.dataset.category;
-                    
-                    if (filter === 'all' || category === filter) {
-                        card.style.display = 'block';
+                    if (this.applyProjectFilter(card, filter)) {
                         visibleCount++;
                         // Collapse expanded cards when filter changes
                         this.collapseProjectCard(card);
-                    } else {
-                        card.style.display = 'none';
                     }
                 });
                 
@@ -282,6 +321,68 @@ class ModernPortfolio {
         });
     }
     
+    // Shows or hides one card for the given filter, returns true if it's visible
+    applyProjectFilter(card, filter) {
+        const visible = filter === 'all' || card.dataset.category === filter;
+        card.style.display = visible ? 'block' : 'none';
+        return visible;
+    }
+    
+    // Load the next batch of project cards when the end of the list scrolls into view
+    setupProjectsLoadMore() {
+        const sentinel = document.getElementById('projectsLoadMore');
+        const projectsList = document.getElementById('projectsList');
+        
+        if (!sentinel || !projectsList) return;
+        
+        let loading = false;
+        
+        const observer = new IntersectionObserver(async (entries) => {
+            if (!entries.some(entry => entry.isIntersecting) || loading) return;
+            
+            loading = true;
+            try {
+                const url = `${sentinel.dataset.url}?after=${encodeURIComponent(sentinel.dataset.cursor)}`;
+                const response = await fetch(url);
+                
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+                }
+                
+                const html = await response.text();
+                const nextCursor = response.headers.get('X-Next-Cursor');
+                
+                // Only filter the new cards, the existing ones are already right
+                const before = projectsList.querySelectorAll('.project-card').length;
+                projectsList.insertAdjacentHTML('beforeend', html);
+                const cards = projectsList.querySelectorAll('.project-card');
+                for (let i = before; i < cards.length; i++) {
+                    this.applyProjectFilter(cards[i], this.activeProjectFilter);
+                }
+                this.setupExpandableProjects();
+                
+                if (nextCursor) {
+                    sentinel.dataset.cursor = nextCursor;
+                    // Re-observing fires again straight away if the sentinel is still on screen
+                    observer.unobserve(sentinel);
+                    observer.observe(sentinel);
+                } else {
+                    observer.disconnect();
+                    sentinel.remove();
+                }
+            } catch (error) {
+                console.error('Loading more projects failed:', error);
+                observer.disconnect();
+            } finally {
+                loading = false;
+            }
+        }, {
+            rootMargin: '0px 0px 400px 0px'
+        });
+        
+        observer.observe(sentinel);
+    }
+    
     // Smooth scroll to projects when clicking sidebar links
     setupProjectNavigation() {
         const navLinks = document.querySelectorAll('.nav-project-link');
@@ -343,6 +444,31 @@ class ModernPortfolio {
         });
     }
 
+    // Fetch menu pages on hover or touch so the click is answered from cache
+    setupMenuPrefetch() {
+        const prefetched = new Set([window.location.href]);
+        
+        document.querySelectorAll('.fullscreen-nav .menu-link').forEach(link => {
+            const prefetch = () => {
+                if (prefetched.has(link.href)) return;
+                prefetched.add(link.href);
+                
+                if (navigator.serviceWorker && navigator.serviceWorker.controller) {
+                    // Goes through the service worker, which stores the page for the navigation
+                    fetch(link.href, { credentials: 'same-origin' }).catch(() => prefetched.delete(link.href));
+                } else {
+                    const hint = document.createElement('link');
+                    hint.rel = 'prefetch';
+                    hint.href = link.href;
+                    document.head.appendChild(hint);
+                }
+            };
+            
+            link.addEventListener('mouseenter', prefetch);
+            link.addEventListener('touchstart', prefetch, { passive: true });
+        });
+    }
+
     // Theme toggle between light and dark mode
     setupThemeToggle() {
         const toggle = document.getElementById('themeToggle');
@@ -0,0 +1,100 @@
+// Service worker - served by service_worker_view, the lists below come from portfolio/service_worker.py
+const VERSION = '{{ version }}';
+const CACHE_NAME = `portfolio-${VERSION}`;
+const PAGE_URLS = {{ page_urls|safe }};
+const ASSET_URLS = {{ asset_urls|safe }};
+// Pages with a per-visitor CSRF token in them - only answered from the cache when offline
+const NETWORK_FIRST_URLS = {{ network_first_urls|safe }};
+// Static folders worth keeping offline - documents and anything else linked straight from /static/ stay out
+const CACHED_STATIC_DIRS = {{ static_dirs|safe }};
+
+// Pages can come back with Vary: Cookie, which shouldn't stop a prefetch matching the navigation
+const PAGE_MATCH = { ignoreVary: true };
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(CACHE_NAME)
+            .then(cache => cache.addAll(PAGE_URLS.concat(ASSET_URLS)))
+            .then(() => self.skipWaiting())
+    );
+});
+
+// Drop caches from older versions once this one takes over
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(names => Promise.all(
+                names
+                    .filter(name => name.startsWith('portfolio-') && name !== CACHE_NAME)
+                    .map(name => caches.delete(name))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) return;
+
+    if (ASSET_URLS.includes(url.pathname)) {
+        // Hashed file names never change content, so the cache is always right
+        event.respondWith(cacheFirst(request));
+    } else if (NETWORK_FIRST_URLS.includes(url.pathname)) {
+        // A cached copy's token may be stale, so it's only used when the network is down
+        event.respondWith(networkFirst(event, request, PAGE_MATCH));
+    } else if (PAGE_URLS.includes(url.pathname)) {
+        // Show the cached page instantly and refresh it in the background for next time
+        event.respondWith(
+            staleWhileRevalidate(event, request, PAGE_MATCH)
+                .catch(() => caches.match(PAGE_URLS[0], PAGE_MATCH))
+        );
+    } else if (CACHED_STATIC_DIRS.some(dir => url.pathname.startsWith(dir))) {
+        // Unhashed copies of the same files (no manifest in development)
+        event.respondWith(staleWhileRevalidate(event, request));
+    } else if (request.mode === 'navigate') {
+        // Anything else still works offline by falling back to the home page
+        event.respondWith(
+            fetch(request).catch(() => caches.match(PAGE_URLS[0], PAGE_MATCH))
+        );
+    }
+});
+
+function cacheFirst(request) {
+    return caches.match(request).then(cached => cached || fetch(request));
+}
+
+function networkFirst(event, request, options) {
+    return fetch(request)
+        .then(response => {
+            if (response.ok && !response.redirected) {
+                const copy = response.clone();
+                event.waitUntil(caches.open(CACHE_NAME).then(cache => cache.put(request, copy)));
+            }
+            return response;
+        })
+        .catch(() => caches.match(request, options));
+}
+
+function staleWhileRevalidate(event, request, options) {
+    return caches.open(CACHE_NAME).then(cache =>
+        cache.match(request, options).then(cached => {
+            const network = fetch(request).then(response => {
+                // Redirected responses can't be used to answer a navigation
+                if (response.ok && !response.redirected) {
+                    cache.put(request, response.clone());
+                }
+                return response;
+            });
+
+            if (cached) {
+                // Keep the worker alive until the refresh has been stored
+                event.waitUntil(network.catch(() => {}));
+                return cached;
+            }
+            return network;
+        })
+    );
+}
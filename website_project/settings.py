@@ -39,18 +39,31 @@ CSRF_TRUSTED_ORIGINS = [
     'http://localhost:8001',
     'http://127.0.0.1:8001',
 ]
+
+# Lean profile - the site keeps no content in the database and doesn't use sessions or
+# flash messages, so leave those apps and their middleware out for faster cold starts
+# and less memory per worker. LEAN_PROFILE=False brings them back
+
+LEAN_PROFILE = config('LEAN_PROFILE', default=True, cast=bool)
+
 # Apps
 
 # Keeping this minimal - only what's actually needed
 
+# portfolio goes first so its incremental collectstatic replaces the stock one
 INSTALLED_APPS = [
-    'django.contrib.contenttypes',
-    'django.contrib.sessions',
-    'django.contrib.messages',
-    'django.contrib.staticfiles',
     'portfolio',
+    'django.contrib.staticfiles',
+    'django.contrib.sitemaps',  # only for its sitemap.xml template, see portfolio/sitemaps.py
 ]
 
+if not LEAN_PROFILE:
+    INSTALLED_APPS[:0] = [
+        'django.contrib.contenttypes',
+        'django.contrib.sessions',
+        'django.contrib.messages',
+    ]
+
 # Add django_extensions only in development
 if DEBUG:
     INSTALLED_APPS.append('django_extensions')
@@ -61,15 +74,21 @@ if DEBUG:
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',  # Security headers
+    'portfolio.middleware.ProfilingMiddleware',       # On-demand cProfile, see PROFILING below
     'django.contrib.sessions.middleware.SessionMiddleware', 
     # Session management
     'whitenoise.middleware.WhiteNoiseMiddleware',     # Serve static files efficiently
+    'portfolio.middleware.LoadSheddingMiddleware',    # Fast 503s when overloaded, see LOAD_SHEDDING below
     'django.middleware.common.CommonMiddleware',      # Common HTTP stuff
     'django.middleware.csrf.CsrfViewMiddleware',      # CSRF protection
     'django.contrib.messages.middleware.MessageMiddleware',  # Flash messages
     'django.middleware.clickjacking.XFrameOptionsMiddleware',  # Anti-clickjacking
 ]
 
+if LEAN_PROFILE:
+    MIDDLEWARE.remove('django.contrib.sessions.middleware.SessionMiddleware')
+    MIDDLEWARE.remove('django.contrib.messages.middleware.MessageMiddleware')
+
 
 # URLs and Templates
 
@@ -85,12 +104,40 @@ TEMPLATES = [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.template.context_processors.static',
-                'django.contrib.messages.context_processors.messages',
             ],
         },
     },
 ]
 
+# How many project cards the projects page renders up front and each 'load more' adds
+PROJECTS_PAGE_SIZE = 4
+
+# Writing section - markdown posts compiled once per edit and cached in CACHE_DIR, see portfolio/articles.py
+ARTICLES = {
+    'SOURCE_DIR': BASE_DIR / 'content' / 'articles',
+    'CACHE_DIR': BASE_DIR / 'cache' / 'articles',
+}
+
+# Previews of the downloadable .docx files, built once per file hash and cached in CACHE_DIR, see portfolio/documents.py
+DOCUMENT_PREVIEWS = {
+    'SOURCE_DIR': BASE_DIR / 'static' / 'documents',
+    'CACHE_DIR': BASE_DIR / 'cache' / 'documents',
+    'EXCERPT_WORDS': 200,  # the opening of the first page, it goes inline in the page HTML
+}
+
+# CV rendered to HTML and PDF from data.py, named by content hash so it's only rebuilt when the content changes, see portfolio/cv.py
+CV = {
+    'OUTPUT_DIR': BASE_DIR / 'cache' / 'cv',
+}
+
+# Stream page views so the <head> reaches the browser before the rest is rendered
+# To gzip pages in Django rather than at the proxy, add portfolio.middleware.StreamingGZipMiddleware
+# at the top of MIDDLEWARE - django.middleware.gzip.GZipMiddleware holds the streamed head back until the page ends
+STREAMING_RENDER = config('STREAMING_RENDER', default=True, cast=bool)
+
+if not LEAN_PROFILE:
+    TEMPLATES[0]['OPTIONS']['context_processors'].append('django.contrib.messages.context_processors.messages')
+
 WSGI_APPLICATION = 'website_project.wsgi.application'
 
 
@@ -122,7 +169,8 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
 # WhiteNoise handles compression and cache headers automatically
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# (the portfolio version only recompresses files whose content changed, see portfolio/storage.py)
+STATICFILES_STORAGE = 'portfolio.storage.IncrementalCompressedStaticFilesStorage'
 
 
 # Media Files (uploaded stuff like PDFs)
@@ -154,6 +202,17 @@ EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default=EMAIL_HOST_USER)
 
 
+# Outbound HTTP (Resend, GitHub) - shared pooled client in portfolio/services/http.py
+
+OUTBOUND_HTTP = {
+    'TIMEOUT': config('OUTBOUND_HTTP_TIMEOUT', default=10, cast=float),
+    'MAX_CONNECTIONS_PER_HOST': config('OUTBOUND_HTTP_MAX_PER_HOST', default=4, cast=int),
+    'POOL_WAIT': 5,  # seconds to wait for a free connection before giving up
+    'CIRCUIT_FAILURE_THRESHOLD': 5,  # failures in a row before we stop calling a host
+    'CIRCUIT_RESET_TIMEOUT': 30,  # seconds before trying a failing host again
+}
+
+
 # GitHub API (optional feature)
 
 
@@ -177,6 +236,75 @@ CACHES = {
 }
 
 
+# Cache misses are coalesced so a cold page is rendered once, not once per concurrent request,
+# and hot entries get refreshed a little before they expire - see portfolio/singleflight.py
+SINGLE_FLIGHT = {
+    'WAIT_TIMEOUT': 10,  # seconds a request waits on someone else's render before doing its own
+    'STREAM_WAIT_TIMEOUT': 0.5,  # the same for a streamed page, whose render only ends when its visitor has read it
+    'LOCK_TIMEOUT': 30,  # how long another worker's claim on a key is trusted for
+    'EARLY_REFRESH_BETA': config('EARLY_REFRESH_BETA', default=1.0, cast=float),  # 0 turns early refresh off
+}
+
+# Edge cache (CDN) - pages carry Surrogate-Key/Cache-Tag headers naming their content sections
+# so purge_edge_cache can drop just the pages affected by a content edit
+
+EDGE_CACHE = {
+    'TTL': config('EDGE_CACHE_TTL', default=0, cast=int),  # s-maxage in seconds, 0 leaves Cache-Control alone
+    'PURGE_URL': config('EDGE_PURGE_URL', default=''),
+    'PURGE_TOKEN': config('EDGE_PURGE_TOKEN', default=''),
+    'PURGE_FORMAT': config('EDGE_PURGE_FORMAT', default='tags'),  # 'tags' (Cloudflare) or 'surrogate_keys' (Fastly)
+    'VERSION_FILE': BASE_DIR / 'content_versions.json',
+}
+
+
+# On-demand profiling - send the header from `manage.py profile_token` to profile one request
+# Results land in OUTPUT_DIR as .prof files, the id comes back in X-Profile-Id
+
+PROFILING = {
+    'ENABLED': config('PROFILING_ENABLED', default=True, cast=bool),
+    'HEADER': 'X-Profile-Token',
+    'TOKEN_MAX_AGE': 60 * 60,  # tokens stop working after an hour
+    'SAMPLE_RATE': config('PROFILING_SAMPLE_RATE', default=0.0, cast=float),  # 0.01 = profile 1% of requests
+    'OUTPUT_DIR': BASE_DIR / 'logs' / 'profiles',
+    'MAX_FILES': 200,
+}
+
+
+# Load shedding - past these limits a request gets an immediate 503 + Retry-After instead of
+# waiting until it times out. In-flight limits are per worker process, queue time needs the
+# proxy to send X-Request-Start.
+# A gthread worker never has more than GUNICORN_THREADS requests in flight, so a pages limit at or
+# above that would never shed - by default pages get the threads the expensive views don't
+
+GUNICORN_THREADS = config('GUNICORN_THREADS', default=8, cast=int)  # same variable gunicorn.conf.py reads
+EXPENSIVE_MAX_IN_FLIGHT = config('LOAD_SHEDDING_EXPENSIVE_MAX_IN_FLIGHT', default=2, cast=int)
+
+LOAD_SHEDDING = {
+    'ENABLED': config('LOAD_SHEDDING_ENABLED', default=True, cast=bool),
+    'RETRY_AFTER': 5,  # seconds
+    'MAX_IN_FLIGHT': config(
+        'LOAD_SHEDDING_MAX_IN_FLIGHT', default=max(GUNICORN_THREADS - EXPENSIVE_MAX_IN_FLIGHT, 1), cast=int,
+    ),
+    'MAX_QUEUE_MS': config('LOAD_SHEDDING_MAX_QUEUE_MS', default=2000, cast=int),
+    # the contact form waits on the Resend API, the dissertations are megabytes and a CV download
+    # renders the CV on a cold cache, so they get far fewer slots
+    'EXPENSIVE_VIEWS': ('portfolio:ajax_contact', 'portfolio:download_msc', 'portfolio:download_bsc', 'portfolio:download_cv'),
+    'EXPENSIVE_MAX_IN_FLIGHT': EXPENSIVE_MAX_IN_FLIGHT,
+    'EXPENSIVE_MAX_QUEUE_MS': config('LOAD_SHEDDING_EXPENSIVE_MAX_QUEUE_MS', default=5000, cast=int),
+}
+
+
+# Self-hosted analytics - events are buffered in memory and written to DB_PATH in batches,
+# `manage.py analytics_rollup` turns them into daily counts
+
+ANALYTICS = {
+    'ENABLED': config('ANALYTICS_ENABLED', default=True, cast=bool),
+    'DB_PATH': config('ANALYTICS_DB_PATH', default=str(BASE_DIR / 'analytics.sqlite3')),
+    'FLUSH_INTERVAL': 10,  # seconds between batch writes
+    'MAX_BUFFER': 10000,  # events held per worker before the oldest are dropped
+}
+
+
 # Logging
 
 # Helpful for debugging issues
@@ -196,7 +324,7 @@ LOGGING = {
             'formatter': 'verbose',
         },
         'file': {
-            'class': 'logging.handlers.RotatingFileHandler',
+            'class': 'portfolio.log_handlers.LazyRotatingFileHandler',  # makes logs/ on first write
             'filename': BASE_DIR / 'logs' / 'django.log',
             'maxBytes': 1024 * 1024 * 5,  # 5MB
             'backupCount': 5,
@@ -221,11 +349,6 @@ LOGGING = {
     },
 }
 
-# Make sure logs directory exists
-
-(BASE_DIR / 'logs').mkdir(exist_ok=True)
-
-
 # Production Security Settings
 
 # These kick in automatically when DEBUG=False
@@ -254,12 +377,15 @@ if not DEBUG:
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Cache templates in production for better performance
+# (minified as they're loaded, so indentation and comments only get stripped once)
 
 if not DEBUG:
+    # Django won't take APP_DIRS and an explicit loaders list together
+    TEMPLATES[0]['APP_DIRS'] = False
     TEMPLATES[0]['OPTIONS']['loaders'] = [
         ('django.template.loaders.cached.Loader', [
-            'django.template.loaders.filesystem.Loader',
-            'django.template.loaders.app_directories.Loader',
+            'portfolio.template_loaders.FilesystemLoader',
+            'portfolio.template_loaders.AppDirectoriesLoader',
         ]),
     ]
 